@@ -0,0 +1,55 @@
+"""hot query indexes
+
+Revision ID: 3b9d51c0e7a4
+Revises: e60d967fb2f3
+Create Date: 2026-10-18 12:04:17.281946
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = '3b9d51c0e7a4'
+down_revision: Union[str, None] = 'e60d967fb2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REAL_USERS = sa.text('NOT is_fake AND NOT is_banned')
+ACTIVE_FAKE_USERS = sa.text('is_fake AND is_active')
+
+
+def check_duplicate_chat_ids():
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('chat_id', sa.BigInteger), sa.column('is_fake', sa.Boolean))
+    duplicate_chat_ids = sa.select(users.c.chat_id).filter(users.c.is_fake == sa.false()).group_by(users.c.chat_id).having(sa.func.count() > 1)
+
+    duplicates = {}
+    for chat_id, user_id in op.get_bind().execute(
+        sa.select(users.c.chat_id, users.c.id)
+        .filter(users.c.is_fake == sa.false(), users.c.chat_id.in_(duplicate_chat_ids))
+        .order_by(users.c.chat_id, users.c.id)
+    ):
+        duplicates.setdefault(chat_id, []).append(user_id)
+
+    if duplicates:
+        details = '; '.join(f"chat_id {chat_id}: user ids {', '.join(map(str, user_ids))}" for chat_id, user_ids in duplicates.items())
+        raise RuntimeError(f"Cannot create unique index ix_users_chat_id, merge or delete duplicate real users first: {details}")
+
+
+def upgrade() -> None:
+    check_duplicate_chat_ids()
+    op.create_index('ix_users_chat_id', 'users', ['chat_id'], unique=True, postgresql_where=sa.text('NOT is_fake'), sqlite_where=sa.text('NOT is_fake'))
+    op.create_index('ix_users_gems_total', 'users', [sa.text('gems_total DESC')])
+    op.create_index('ix_users_real_next_refill_time', 'users', ['next_refill_time'], postgresql_where=REAL_USERS, sqlite_where=REAL_USERS)
+    op.create_index('ix_users_real_last_spin_time', 'users', ['last_spin_time'], postgresql_where=REAL_USERS, sqlite_where=REAL_USERS)
+    op.create_index('ix_users_fake_next_autospin_time', 'users', ['next_autospin_time'], postgresql_where=ACTIVE_FAKE_USERS, sqlite_where=ACTIVE_FAKE_USERS)
+    op.create_index('ix_user_tournament_stats_tournament_id_gems', 'user_tournament_stats', ['tournament_id', sa.text('gems DESC')])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_tournament_stats_tournament_id_gems', table_name='user_tournament_stats')
+    op.drop_index('ix_users_fake_next_autospin_time', table_name='users')
+    op.drop_index('ix_users_real_last_spin_time', table_name='users')
+    op.drop_index('ix_users_real_next_refill_time', table_name='users')
+    op.drop_index('ix_users_gems_total', table_name='users')
+    op.drop_index('ix_users_chat_id', table_name='users')
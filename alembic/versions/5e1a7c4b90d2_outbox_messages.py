@@ -0,0 +1,40 @@
+"""outbox messages
+
+Revision ID: 5e1a7c4b90d2
+Revises: 9c2f6e8a1d35
+Create Date: 2026-10-18 15:12:09.336471
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = '5e1a7c4b90d2'
+down_revision: Union[str, None] = '9c2f6e8a1d35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox_messages',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('broadcast', sa.String(), nullable=False),
+        sa.Column('chat_id', sa.BigInteger(), nullable=False),
+        sa.Column('message_text', sa.Text(), nullable=False),
+        sa.Column('reply_markup', sa.Text(), nullable=True),
+        sa.Column('priority', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.Column('is_delivered', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_messages_pending', 'outbox_messages', [sa.text('priority DESC'), 'id'], postgresql_where=sa.text('sent_at IS NULL'), sqlite_where=sa.text('sent_at IS NULL'))
+    op.create_index('ix_outbox_messages_broadcast', 'outbox_messages', ['broadcast'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_messages_broadcast', table_name='outbox_messages')
+    op.drop_index('ix_outbox_messages_pending', table_name='outbox_messages')
+    op.drop_table('outbox_messages')
@@ -0,0 +1,23 @@
+"""users referrer_id index
+
+Revision ID: 9c2f6e8a1d35
+Revises: 3b9d51c0e7a4
+Create Date: 2026-10-18 13:41:52.904318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = '9c2f6e8a1d35'
+down_revision: Union[str, None] = '3b9d51c0e7a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_referrer_id', 'users', ['referrer_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_referrer_id', table_name='users')
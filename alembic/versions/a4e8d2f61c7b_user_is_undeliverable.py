@@ -0,0 +1,25 @@
+"""user is_undeliverable
+
+Revision ID: a4e8d2f61c7b
+Revises: 5e1a7c4b90d2
+Create Date: 2026-10-18 17:12:40.218734
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e8d2f61c7b'
+down_revision: Union[str, None] = '5e1a7c4b90d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('is_undeliverable', sa.Boolean(), nullable=True, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'is_undeliverable')
@@ -0,0 +1,39 @@
+"""winner submissions
+
+Revision ID: b8e27c5d04f3
+Revises: f1c6a83d92e4
+Create Date: 2026-10-18 20:41:36.104587
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e27c5d04f3'
+down_revision: Union[str, None] = 'f1c6a83d92e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'winner_submissions',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('tournament_id', sa.Integer(), nullable=False),
+        sa.Column('row', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('submitted_at', sa.DateTime(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['tournament_id'], ['tournaments.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_winner_submissions_pending', 'winner_submissions', ['id'], postgresql_where=sa.text('submitted_at IS NULL'), sqlite_where=sa.text('submitted_at IS NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_winner_submissions_pending', table_name='winner_submissions')
+    op.drop_table('winner_submissions')
@@ -0,0 +1,45 @@
+"""sqlite partial index predicates
+
+Revision ID: c3a9e15b7d48
+Revises: b8e27c5d04f3
+Create Date: 2026-10-19 10:14:52.730158
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a9e15b7d48'
+down_revision: Union[str, None] = 'b8e27c5d04f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# SQLite only uses a partial index when the query repeats its predicate, and
+# boolean filters compile to "is_fake = 0" there instead of "NOT is_fake".
+INDEXES = [
+    ('ix_users_chat_id', 'chat_id', True, 'NOT is_fake', 'is_fake = 0'),
+    ('ix_users_real_next_refill_time', 'next_refill_time', False, 'NOT is_fake AND NOT is_banned', 'is_fake = 0 AND is_banned = 0'),
+    ('ix_users_real_last_spin_time', 'last_spin_time', False, 'NOT is_fake AND NOT is_banned', 'is_fake = 0 AND is_banned = 0'),
+    ('ix_users_real_next_warning_time', 'next_warning_time', False, 'NOT is_fake AND NOT is_banned', 'is_fake = 0 AND is_banned = 0'),
+    ('ix_users_real_updated_at', 'updated_at', False, 'NOT is_fake', 'is_fake = 0'),
+    ('ix_users_fake_next_autospin_time', 'next_autospin_time', False, 'is_fake AND is_active', 'is_fake = 1 AND is_active = 1')
+]
+
+
+def recreate_indexes(is_upgrade: bool):
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for name, column, unique, old_predicate, new_predicate in INDEXES:
+        op.drop_index(name, table_name='users')
+        op.create_index(name, 'users', [column], unique=unique, sqlite_where=sa.text(new_predicate if is_upgrade else old_predicate))
+
+
+def upgrade() -> None:
+    recreate_indexes(True)
+
+
+def downgrade() -> None:
+    recreate_indexes(False)
@@ -0,0 +1,25 @@
+"""winner submission next_attempt_at
+
+Revision ID: d45f8b2e9c16
+Revises: c3a9e15b7d48
+Create Date: 2026-10-19 11:02:37.615204
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd45f8b2e9c16'
+down_revision: Union[str, None] = 'c3a9e15b7d48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('winner_submissions', sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('winner_submissions', 'next_attempt_at')
@@ -0,0 +1,56 @@
+"""user next_warning_time
+
+Revision ID: d7b3f09e5a21
+Revises: a4e8d2f61c7b
+Create Date: 2026-10-18 18:05:11.537902
+
+"""
+from datetime import datetime, timedelta, time
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7b3f09e5a21'
+down_revision: Union[str, None] = 'a4e8d2f61c7b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REAL_USERS = sa.text('NOT is_fake AND NOT is_banned')
+WARNING_LEVELS = [(1, 12), (2, 24), (3, 72)]
+
+
+def get_next_warning_time(last_spin_time: datetime, warning_level: int) -> datetime | None:
+    delta_hours = next((delta_hours for level, delta_hours in WARNING_LEVELS if level > warning_level), None)
+    if delta_hours is None:
+        return None
+
+    next_day = datetime.combine(last_spin_time.date() + timedelta(days=1), time.min)
+    return max(last_spin_time + timedelta(hours=delta_hours), next_day)
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('next_warning_time', sa.DateTime(), nullable=True))
+    op.create_index('ix_users_real_next_warning_time', 'users', ['next_warning_time'], postgresql_where=REAL_USERS, sqlite_where=REAL_USERS)
+
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('last_spin_time', sa.DateTime), sa.column('warning_level', sa.Integer), sa.column('next_warning_time', sa.DateTime))
+    connection = op.get_bind()
+
+    rows = [
+        {'user_id': user_id, 'next_warning_time': get_next_warning_time(last_spin_time, warning_level or 0)}
+        for user_id, last_spin_time, warning_level in connection.execute(
+            sa.select(users.c.id, users.c.last_spin_time, users.c.warning_level).where(users.c.last_spin_time.is_not(None))
+        )
+    ]
+
+    if rows:
+        connection.execute(
+            users.update().where(users.c.id == sa.bindparam('user_id')).values(next_warning_time=sa.bindparam('next_warning_time')),
+            rows
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_real_next_warning_time', table_name='users')
+    op.drop_column('users', 'next_warning_time')
@@ -0,0 +1,31 @@
+"""user updated_at
+
+Revision ID: f1c6a83d92e4
+Revises: d7b3f09e5a21
+Create Date: 2026-10-18 19:27:03.661245
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c6a83d92e4'
+down_revision: Union[str, None] = 'd7b3f09e5a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    users = sa.table('users', sa.column('created_at', sa.DateTime), sa.column('updated_at', sa.DateTime))
+    op.execute(users.update().values(updated_at=sa.func.coalesce(users.c.created_at, sa.func.now())))
+
+    op.create_index('ix_users_real_updated_at', 'users', ['updated_at'], postgresql_where=sa.text('NOT is_fake'), sqlite_where=sa.text('NOT is_fake'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_real_updated_at', table_name='users')
+    op.drop_column('users', 'updated_at')
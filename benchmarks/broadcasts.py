@@ -0,0 +1,89 @@
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime
+from unittest import mock
+
+from benchmarks.common import setup_environment, timer, print_results
+
+MESSAGES_AMOUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+LATENCY = (0.05, 0.25)
+RETRY_AFTER_RATE = 0.01
+RETRY_AFTER_SECONDS = 1
+
+setup_environment('broadcasts.db')
+
+import gspread
+from aiogram import methods
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import Message, Chat
+from oauth2client.service_account import ServiceAccountCredentials
+
+with mock.patch.object(ServiceAccountCredentials, 'from_json_keyfile_name'), mock.patch.object(gspread, 'authorize'):
+    from src import handlers
+    from src.broadcasts import broadcaster
+    from src.config import BROADCAST_RATE_LIMIT, BROADCAST_CONCURRENCY
+    from src.delivery import delivery
+
+
+class FakeBotSession(BaseSession):
+    def __init__(self):
+        super().__init__()
+        self.sent_at = []
+        self.message_ids = iter(range(1, sys.maxsize))
+
+    async def make_request(self, bot, method, timeout=None):
+        self.sent_at.append(time.monotonic())
+        await asyncio.sleep(random.uniform(*LATENCY))
+
+        if random.random() < RETRY_AFTER_RATE:
+            raise TelegramRetryAfter(method, "Too Many Requests: retry after", RETRY_AFTER_SECONDS)
+
+        if isinstance(method, methods.SendMessage):
+            return Message(message_id=next(self.message_ids), date=datetime.utcnow(), chat=Chat(id=method.chat_id, type='private'), text=method.text)
+
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b''
+
+    async def close(self):
+        pass
+
+
+def get_peak_rate(sent_at: list) -> int:
+    peak, start = 0, 0
+    for end, sent_time in enumerate(sent_at):
+        while sent_time - sent_at[start] >= 1:
+            start += 1
+        peak = max(peak, end - start + 1)
+
+    return peak
+
+
+async def main():
+    session = FakeBotSession()
+    handlers.bot.session = session
+    results = {}
+
+    jobs = (broadcaster.send_message(10_000_000 + index, f"Benchmark message {index}") for index in range(MESSAGES_AMOUNT))
+    with timer(results, f"broadcast {MESSAGES_AMOUNT} messages"):
+        await broadcaster.run(jobs)
+
+    elapsed = results[f"broadcast {MESSAGES_AMOUNT} messages"]
+    counters = delivery.counters
+    steady_sent_at = session.sent_at[len(session.sent_at) // 10:]
+    steady_rate = (len(steady_sent_at) - 1) / (steady_sent_at[-1] - steady_sent_at[0])
+
+    print_results(f"Broadcaster throughput, latency {LATENCY[0]}-{LATENCY[1]} s, {RETRY_AFTER_RATE:.0%} RetryAfter", results)
+    print(f"  configured limit {BROADCAST_RATE_LIMIT} msgs/s, concurrency {BROADCAST_CONCURRENCY}")
+    print(f"  average {counters['delivered'] / elapsed:.1f} msgs/s, steady {steady_rate:.1f} msgs/s, peak {get_peak_rate(session.sent_at)} requests in 1 s")
+    print(f"  delivered {counters['delivered']}, retry_after {counters['retry_after']}, global pauses {counters['global_pause']}, dropped {counters['dropped']}")
+
+    await handlers.bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+ENVIRONMENT = {
+    'BOT_TOKEN': '123456:benchmark',
+    'BOT_USERNAME': 'benchmark_bot',
+    'BOT_ADMINS': '[]',
+    'BOT_OWNER_ID': '0',
+    'MAIN_GROUP_ID': '0',
+    'MAIN_GROUP_URL': '',
+    'GAME_TOPIC_ID': '0',
+    'RESULTS_TOPIC_ID': '0',
+    'FEEDBACK_TOPIC_ID': '0',
+    'FEEDBACK_TOPIC_URL': '',
+    'SERVER_DOMAIN': 'localhost',
+    'SERVER_HOST': '127.0.0.1',
+    'SERVER_PORT': '8000'
+}
+
+
+def setup_environment(database_name: str) -> str:
+    for key, value in ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
+
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), database_name)}")
+    return os.environ['DATABASE_URL']
+
+
+def create_user_rows(amount: int, now: datetime) -> list[dict]:
+    rows = []
+    for index in range(amount):
+        last_spin_time = now - timedelta(minutes=random.randint(0, 7 * 24 * 60)) if random.random() < 0.8 else None
+        rows.append({
+            'chat_id': 10_000_000 + index,
+            'username': f'user{index}',
+            'language': random.choice(['en', 'ru', 'es', 'pt', 'fr', 'hi', 'tr']),
+            'anon_name': f'Anon{index}',
+            'created_at': now - timedelta(days=30),
+            'updated_at': now - timedelta(days=1),
+            'gems_total': random.randint(0, 5000),
+            'spins_left': random.randint(0, 10),
+            'is_fake': False,
+            'is_active': False,
+            'is_banned': random.random() < 0.01,
+            'last_spin_time': last_spin_time,
+            'next_refill_time': now + timedelta(minutes=random.randint(-5, 60)) if random.random() < 0.3 else None,
+            'next_autospin_time': now,
+            'warning_level': 0
+        })
+
+    return rows
+
+
+def compile_query(statement, dialect) -> str:
+    return str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+
+def get_explain_prefix(dialect) -> str:
+    return 'EXPLAIN QUERY PLAN' if dialect.name == 'sqlite' else 'EXPLAIN'
+
+
+@contextmanager
+def timer(results: dict, name: str):
+    started_at = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - started_at
+
+
+def print_results(title: str, results: dict):
+    print(title)
+    for name, seconds in results.items():
+        print(f"  {name:<40} {seconds * 1000:10.1f} ms")
@@ -0,0 +1,126 @@
+import random
+import sys
+import time
+from datetime import datetime, timedelta, date
+
+from benchmarks.common import setup_environment, create_user_rows, timer, print_results, compile_query, get_explain_prefix
+
+USERS_AMOUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+QUERY_RUNS = 20
+
+database_url = setup_environment('hot_query_indexes.db')
+
+from sqlalchemy import create_engine, insert, select, text
+
+from src.models import Base, User, Tournament, UserTournamentStats
+
+# Indexes added by the 3b9d51c0e7a4 "hot query indexes" revision.
+MIGRATION_INDEXES = [
+    'ix_users_chat_id',
+    'ix_users_gems_total',
+    'ix_users_real_next_refill_time',
+    'ix_users_real_last_spin_time',
+    'ix_users_fake_next_autospin_time',
+    'ix_user_tournament_stats_tournament_id_gems'
+]
+
+
+def get_migration_indexes():
+    return [index for index in get_user_indexes() if index.name in MIGRATION_INDEXES]
+
+
+def get_user_indexes():
+    return [index for table in (User.__table__, UserTournamentStats.__table__) for index in table.indexes]
+
+
+def seed(engine, now: datetime) -> tuple[int, int]:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    with engine.begin() as connection:
+        for index in get_user_indexes():
+            index.drop(connection)
+
+        rows = create_user_rows(USERS_AMOUNT, now)
+        rows += [
+            {**row, 'chat_id': 0, 'is_fake': True, 'is_active': index < 20, 'next_autospin_time': now + timedelta(minutes=random.randint(-30, 30))}
+            for index, row in enumerate(create_user_rows(60, now))
+        ]
+        for index in range(0, len(rows), 20_000):
+            connection.execute(insert(User), rows[index:index + 20_000])
+
+        tournament_id = connection.execute(insert(Tournament).values(start_date=date.today(), end_date=date.today()).returning(Tournament.id)).scalar()
+        stats = [
+            {'user_id': user_id, 'tournament_id': tournament_id, 'gems': random.randint(0, 3000)}
+            for user_id in random.sample(range(1, USERS_AMOUNT + 1), USERS_AMOUNT // 5)
+        ]
+        for index in range(0, len(stats), 20_000):
+            connection.execute(insert(UserTournamentStats), stats[index:index + 20_000])
+
+    return tournament_id, rows[USERS_AMOUNT // 2]['chat_id']
+
+
+def get_hot_queries(now: datetime, tournament_id: int, chat_id: int) -> dict:
+    return {
+        'get_user by chat_id': select(User).filter_by(chat_id=chat_id, is_fake=False).limit(1),
+        'all-time top 10': select(User.id, User.gems_total).order_by(User.gems_total.desc()).limit(10),
+        'users due for refill': select(User).filter_by(is_fake=False, is_banned=False).filter(User.next_refill_time < now),
+        'users idle for 72 hours': select(User.id).filter_by(is_fake=False, is_banned=False).filter(User.last_spin_time <= now - timedelta(hours=72)),
+        'fakes due for autospin': select(User).filter_by(is_fake=True, is_active=True).filter(User.next_autospin_time < now),
+        'tournament top 10': (
+            select(UserTournamentStats)
+            .filter_by(tournament_id=tournament_id)
+            .filter(UserTournamentStats.gems > 0)
+            .order_by(UserTournamentStats.gems.desc())
+            .limit(10)
+        )
+    }
+
+
+def measure(engine, queries: dict) -> tuple[dict, dict]:
+    timings, plans = {}, {}
+
+    with engine.connect() as connection:
+        for name, query in queries.items():
+            plan = connection.execute(text(f"{get_explain_prefix(engine.dialect)} {compile_query(query, engine.dialect)}")).all()
+            plans[name] = "; ".join(str(row[-1]) for row in plan)
+
+            started_at = time.perf_counter()
+            for _ in range(QUERY_RUNS):
+                connection.execute(query).all()
+            timings[name] = (time.perf_counter() - started_at) / QUERY_RUNS
+
+    return timings, plans
+
+
+def main():
+    engine = create_engine(database_url)
+    now = datetime.utcnow()
+    results = {}
+
+    with timer(results, f"seed {USERS_AMOUNT} users"):
+        tournament_id, chat_id = seed(engine, now)
+
+    queries = get_hot_queries(now, tournament_id, chat_id)
+    before_timings, before_plans = measure(engine, queries)
+
+    with timer(results, "create migration indexes"):
+        with engine.begin() as connection:
+            for index in get_migration_indexes():
+                index.create(connection)
+            connection.execute(text('ANALYZE'))
+
+    after_timings, after_plans = measure(engine, queries)
+
+    print_results("setup", results)
+    print(f"hot queries, {USERS_AMOUNT} users, average of {QUERY_RUNS} runs")
+    for name in queries:
+        print(f"  {name:<28} {before_timings[name] * 1000:10.2f} ms -> {after_timings[name] * 1000:8.2f} ms")
+        print(f"    before: {before_plans[name]}")
+        print(f"    after:  {after_plans[name]}")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
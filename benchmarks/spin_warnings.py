@@ -0,0 +1,104 @@
+import asyncio
+import random
+import sys
+from datetime import datetime, timedelta
+
+from benchmarks.common import setup_environment, create_user_rows, timer, print_results, compile_query, get_explain_prefix
+
+USERS_AMOUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+TICKS_AMOUNT = 10
+
+setup_environment('spin_warnings.db')
+
+from sqlalchemy import insert, select, text
+
+from src import database
+from src.models import User
+from src.utils import get_warning_level, get_next_warning_time
+
+
+async def seed(now: datetime):
+    async with database.engine.begin() as connection:
+        await connection.run_sync(database.Base.metadata.drop_all)
+        await connection.run_sync(database.Base.metadata.create_all)
+
+    rows = create_user_rows(USERS_AMOUNT, now)
+    for row in rows:
+        if row['last_spin_time']:
+            row['warning_level'] = random.choice([0, 0, 0, 1, 2])
+            row['next_warning_time'] = get_next_warning_time(row['last_spin_time'], row['warning_level'])
+
+    async with database.session_scope():
+        for index in range(0, len(rows), 10_000):
+            await database.session.execute(insert(User), rows[index:index + 10_000])
+        await database.commit()
+
+
+async def scan_tick(now: datetime) -> int:
+    due_users = 0
+
+    async with database.session_scope():
+        for user in await database.get_all_users(is_fake=False, is_banned=False):
+            if not user.last_spin_time or user.last_spin_time.date() == now.date():
+                continue
+
+            warning_level = get_warning_level(now - user.last_spin_time)
+            if warning_level > user.warning_level:
+                due_users += 1
+
+    return due_users
+
+
+async def indexed_tick(now: datetime) -> int:
+    due_users = 0
+
+    async with database.session_scope():
+        for user in await database.get_users_due_for_warning(now):
+            warning_level = get_warning_level(now - user.last_spin_time)
+            user.next_warning_time = get_next_warning_time(user.last_spin_time, max(warning_level, user.warning_level))
+
+            if warning_level > user.warning_level:
+                user.warning_level = warning_level
+                due_users += 1
+
+        await database.commit()
+
+    return due_users
+
+
+async def main():
+    now = datetime.utcnow()
+    results = {}
+
+    with timer(results, f"seed {USERS_AMOUNT} users"):
+        await seed(now)
+
+    with timer(results, "full scan tick (previous job)"):
+        scanned_due_users = await scan_tick(now)
+
+    with timer(results, "first indexed tick (backlog)"):
+        first_due_users = await indexed_tick(now)
+
+    due_users = []
+    with timer(results, f"{TICKS_AMOUNT} steady indexed ticks"):
+        for tick in range(1, TICKS_AMOUNT + 1):
+            due_users.append(await indexed_tick(now + timedelta(minutes=tick)))
+
+    results["average steady indexed tick"] = results[f"{TICKS_AMOUNT} steady indexed ticks"] / TICKS_AMOUNT
+
+    dialect = database.engine.dialect
+    due_query = select(User).filter_by(is_fake=False, is_banned=False, is_undeliverable=False).filter(User.next_warning_time <= now)
+
+    async with database.session_scope():
+        plan = (await database.session.execute(text(f"{get_explain_prefix(dialect)} {compile_query(due_query, dialect)}"))).all()
+
+    print_results(f"send_spin_warnings per-tick cost, {USERS_AMOUNT} users", results)
+    print(f"  due users: full scan {scanned_due_users}, first indexed tick {first_due_users}, steady ticks {due_users}")
+    for row in plan:
+        print(f"  plan: {row[-1]}")
+
+    await database.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+
+from aiogram.types import Message, InlineKeyboardMarkup
+from cachetools import TTLCache
+
+from src import database, handlers
+from src.delivery import TokenBucket, delivery
+from src.config import BROADCAST_RATE_LIMIT, BROADCAST_CONCURRENCY, BROADCAST_CHAT_INTERVAL, OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL, GROUP_RATE_LIMIT, MAIN_GROUP_ID
+
+
+class Broadcaster:
+    def __init__(self, rate_limit: float, concurrency: int, chat_interval: float):
+        self.bucket = TokenBucket(rate_limit, 1)
+        self.concurrency = concurrency
+        self.chat_interval = chat_interval
+        self.chat_ready_at = TTLCache(maxsize=100000, ttl=60)
+
+    async def wait_for_chat(self, chat_id: int):
+        now = time.monotonic()
+        ready_at = max(self.chat_ready_at.get(chat_id, now), now)
+        self.chat_ready_at[chat_id] = ready_at + self.chat_interval
+
+        if ready_at > now:
+            await asyncio.sleep(ready_at - now)
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> Message | None:
+        await self.wait_for_chat(chat_id)
+        return await delivery.deliver(chat_id, lambda: handlers.bot.send_message(chat_id, text, **kwargs), self.bucket)
+
+    async def delete_message(self, chat_id: int, message_id: int) -> bool | None:
+        await self.wait_for_chat(chat_id)
+        return await delivery.deliver(chat_id, lambda: handlers.bot.delete_message(chat_id, message_id), self.bucket)
+
+    async def run(self, jobs):
+        jobs = iter(jobs)
+        counters = delivery.counters.copy()
+        try:
+            await asyncio.gather(*(self.run_worker(jobs) for _ in range(self.concurrency)))
+        finally:
+            await database.set_chats_undeliverable(delivery.pop_undeliverable_chat_ids())
+            if counters := delivery.counters - counters:
+                logging.info("Broadcast finished: %s", dict(counters))
+
+    async def run_worker(self, jobs):
+        for job in jobs:
+            try:
+                await job
+            except Exception:
+                logging.exception("Broadcast job failed")
+
+
+broadcaster = Broadcaster(BROADCAST_RATE_LIMIT, BROADCAST_CONCURRENCY, BROADCAST_CHAT_INTERVAL)
+group_bucket = TokenBucket(GROUP_RATE_LIMIT / 60, 1)
+
+
+async def send_group_message(topic_id: int, text: str, **kwargs) -> Message | None:
+    return await delivery.deliver(MAIN_GROUP_ID, lambda: handlers.send_group_message(topic_id, text, **kwargs), group_bucket)
+
+
+def create_outbox_message(broadcast: str, chat_id: int, text: str, reply_markup: InlineKeyboardMarkup | str = None, priority: int = 0) -> dict:
+    return {
+        'broadcast': broadcast,
+        'chat_id': chat_id,
+        'message_text': text,
+        'reply_markup': dump_reply_markup(reply_markup) if isinstance(reply_markup, InlineKeyboardMarkup) else reply_markup,
+        'priority': priority
+    }
+
+
+def dump_reply_markup(reply_markup: InlineKeyboardMarkup) -> str:
+    return reply_markup.model_dump_json(exclude_none=True)
+
+
+async def send_outbox_message(message, delivered_ids: list, failed_ids: list):
+    reply_markup = InlineKeyboardMarkup.model_validate_json(message.reply_markup) if message.reply_markup else None
+
+    if await broadcaster.send_message(message.chat_id, message.message_text, reply_markup=reply_markup):
+        delivered_ids.append(message.id)
+    else:
+        failed_ids.append(message.id)
+
+
+@database.with_session
+async def drain_outbox_batch() -> int:
+    messages = await database.get_pending_outbox_messages(OUTBOX_BATCH_SIZE)
+    delivered_ids, failed_ids = [], []
+
+    try:
+        await broadcaster.run(send_outbox_message(message, delivered_ids, failed_ids) for message in messages)
+    finally:
+        await database.mark_outbox_messages_sent(delivered_ids, failed_ids)
+
+    return len(messages)
+
+
+async def drain_outbox():
+    while True:
+        try:
+            if await drain_outbox_batch():
+                continue
+        except Exception:
+            logging.exception("Outbox drain failed")
+
+        await asyncio.sleep(OUTBOX_POLL_INTERVAL)
@@ -27,6 +27,16 @@ SERVER_PORT = int(os.getenv("SERVER_PORT"))
 USERS_SHEET_NAME = "iguildusers"
 # Название таблицы с победителями в Google Sheets
 WINNERS_SHEET_NAME = "iguildwinners"
+# Сколько строк отправляется в Google Sheets за один запрос
+SHEETS_BATCH_SIZE = 500
+# Максимальное количество задач в очереди Google Sheets
+SHEETS_QUEUE_SIZE = 10
+# Сколько заявок победителей отправляется в Google Sheets за один проход
+WINNER_SUBMISSIONS_BATCH_SIZE = 100
+# Задержка перед повторной отправкой заявки победителя, удваивается после каждой неудачи (в секундах)
+WINNER_SUBMISSIONS_RETRY_DELAY = 60
+# Максимальная задержка перед повторной отправкой заявки победителя (в секундах)
+WINNER_SUBMISSIONS_MAX_RETRY_DELAY = 3600
 
 # Язык по умолчанию
 DEFAULT_LANGUAGE = "en"
@@ -39,6 +49,39 @@ REFERRAL_GEMS_RATE = 0.05
 
 # Задержка между пополнением спинов (в часах)
 SPIN_REFILL_DELAY = 1
+# Уровни предупреждений о неактивности: (уровень, часов с последнего спина)
+SPIN_WARNING_LEVELS = [(1, 12), (2, 24), (3, 72)]
+
+# Лимит сообщений в секунду при массовых рассылках
+BROADCAST_RATE_LIMIT = 25
+# Количество одновременных отправок при массовых рассылках
+BROADCAST_CONCURRENCY = 20
+# Минимальный интервал между сообщениями в один чат (в секундах)
+BROADCAST_CHAT_INTERVAL = 1
+# Лимит сообщений в минуту в основной группе
+GROUP_RATE_LIMIT = 20
+
+# Максимальное количество повторных попыток отправки сообщения
+DELIVERY_MAX_RETRIES = 3
+# Базовая задержка перед повторной попыткой при сетевой ошибке (в секундах)
+DELIVERY_BACKOFF_BASE = 1
+# Сколько разных чатов должны получить 429 за окно, чтобы приостановить все отправки
+DELIVERY_GLOBAL_PAUSE_CHATS = 3
+# Окно для подсчета чатов, получивших 429 (в секундах)
+DELIVERY_GLOBAL_PAUSE_WINDOW = 1
+
+# Максимальный интервал между проверками восстановления спинов (в секундах)
+REFILL_POLL_INTERVAL = 60
+
+# Сколько сообщений из очереди рассылки отправляется за один проход
+OUTBOX_BATCH_SIZE = 200
+# Интервал проверки очереди рассылки (в секундах)
+OUTBOX_POLL_INTERVAL = 5
+
+# Время жизни кэша пользователей (в секундах)
+USER_CACHE_TTL = 5
+# Максимальное количество пользователей в кэше
+USER_CACHE_SIZE = 10000
 
 # Количество фейковых юзеров
 FAKE_USERS_AMOUNT = 60
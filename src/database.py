@@ -1,113 +1,361 @@
 import math
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import date, timedelta, datetime
+from functools import wraps
 
-from sqlalchemy import create_engine
-from sqlalchemy import update
-from sqlalchemy.orm import sessionmaker
+from cachetools import TTLCache
+from sqlalchemy import select, update, func, literal, or_, inspect, make_url, case
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, async_scoped_session
+from sqlalchemy.orm import selectinload
 
-from src.config import DATABASE_URL, SPIN_REFILL_DELAY, REFERRAL_GEMS_RATE, DEFAULT_SPINS_AMOUNT, FAKE_USERS_AMOUNT
-from src.models import Base, User, Tournament, UserTournamentStats
+from src.config import DATABASE_URL, SPIN_REFILL_DELAY, REFERRAL_GEMS_RATE, DEFAULT_SPINS_AMOUNT, FAKE_USERS_AMOUNT, USER_CACHE_TTL, USER_CACHE_SIZE
+from src.leaderboards import all_time_leaderboard, tournament_leaderboard
+from src.models import Base, User, Tournament, UserTournamentStats, OutboxMessage, WinnerSubmission
+from src.utils import get_next_warning_time, get_next_submission_attempt_time
 
-engine = create_engine(DATABASE_URL)
-Base.metadata.create_all(engine)
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite'
+}
 
-Session = sessionmaker(bind=engine)
-session = Session()
 
+def create_async_url(url: str):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
 
-def commit():
-    session.commit()
 
+engine = create_async_engine(create_async_url(DATABASE_URL))
 
-def add_user(user: User):
+Session = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+session_scope_id = ContextVar('session_scope_id', default=None)
+session = async_scoped_session(Session, scopefunc=session_scope_id.get)
+
+
+@asynccontextmanager
+async def session_scope():
+    token = session_scope_id.set(object())
+    try:
+        yield session
+    finally:
+        await session.remove()
+        session_scope_id.reset(token)
+
+
+def with_session(func):
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        async with session_scope():
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+class CurrentTournamentCache:
+    def __init__(self):
+        self.tournament = None
+        self.is_loaded = False
+
+    def set(self, tournament: Tournament | None):
+        self.tournament = tournament
+        self.is_loaded = True
+
+    def invalidate(self):
+        self.tournament = None
+        self.is_loaded = False
+
+
+current_tournament_cache = CurrentTournamentCache()
+banned_chat_ids = set()
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+@with_session
+async def init_database():
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    if not await session.scalar(select(User).limit(1)):
+        await create_fake_users(FAKE_USERS_AMOUNT)
+
+    banned_chat_ids.update(await session.scalars(select(User.chat_id).filter_by(is_banned=True)))
+    await load_leaderboards()
+
+
+async def load_leaderboards():
+    all_time_leaderboard.load(await session.execute(select(User.id, User.gems_total).filter(User.gems_total > 0)))
+
+    current_tournament = await get_current_tournament()
+    if current_tournament:
+        tournament_leaderboard.load(await session.execute(
+            select(UserTournamentStats.user_id, UserTournamentStats.gems)
+            .filter_by(tournament_id=current_tournament.id)
+            .filter(UserTournamentStats.gems > 0)
+        ))
+    else:
+        tournament_leaderboard.clear()
+
+
+async def commit():
+    await session.commit()
+
+
+async def add_user(user: User):
     session.add(user)
-    commit()
+    await commit()
+
+
+async def get_user(chat_id: int) -> User:
+    return await session.scalar(select(User).filter_by(chat_id=chat_id, is_fake=False).limit(1))  # type: ignore
+
+
+async def get_cached_user(chat_id: int) -> User | None:
+    cached_user = user_cache.get(chat_id)
+    if cached_user:
+        return await session.merge(cached_user, load=False)
 
+    return await get_user(chat_id)
 
-def get_user(chat_id: int) -> User:
-    return session.query(User).filter_by(chat_id=chat_id).first()  # type: ignore
 
+def cache_user(user: User):
+    if inspect(user).modified:
+        user_cache.pop(user.chat_id, None)
+    else:
+        user_cache[user.chat_id] = user
 
-def get_user_by_id(user_id: int) -> User:
-    return session.get(User, user_id)  # type: ignore
 
+def invalidate_cached_user(chat_id: int):
+    user_cache.pop(chat_id, None)
 
-def get_user_by_chat_id(chat_id: int) -> User:
-    return session.query(User).filter_by(chat_id=chat_id).first()  # type: ignore
 
+async def get_user_by_id(user_id: int) -> User:
+    return await session.get(User, user_id)  # type: ignore
 
-def get_all_users(**kwargs) -> list:
-    return session.query(User).filter_by(**kwargs).all()
 
+async def get_user_by_chat_id(chat_id: int) -> User:
+    return await session.scalar(select(User).filter_by(chat_id=chat_id, is_fake=False).limit(1))  # type: ignore
 
-def get_leaderboard() -> list:
-    return session.query(User).filter(User.gems_total > 0).order_by(User.gems_total.desc()).limit(10).all()
+
+async def get_all_users(**kwargs) -> list:
+    return list(await session.scalars(select(User).filter_by(**kwargs)))
+
+
+async def get_users_due_for_refill(now: datetime) -> list:
+    return list(await session.scalars(
+        select(User)
+        .filter_by(is_fake=False, is_banned=False)
+        .filter(User.next_refill_time < now)
+        .order_by(User.next_refill_time)
+    ))
+
+
+async def get_users_due_for_warning(now: datetime) -> list:
+    return list(await session.scalars(
+        select(User)
+        .filter_by(is_fake=False, is_banned=False, is_undeliverable=False)
+        .filter(User.next_warning_time <= now)
+    ))
+
+
+async def get_users_updated_since(since: datetime | None) -> list:
+    statement = select(User).filter_by(is_fake=False)
+    if since:
+        statement = statement.filter(User.updated_at >= since)
+
+    return list(await session.scalars(statement))
+
+
+async def get_fakes_due_for_autospin(now: datetime) -> list:
+    return list(await session.scalars(
+        select(User)
+        .filter_by(is_fake=True, is_active=True)
+        .filter(User.next_autospin_time < now)
+    ))
+
+
+async def get_next_refill_time() -> datetime | None:
+    return await session.scalar(select(func.min(User.next_refill_time)).filter_by(is_fake=False, is_banned=False))
+
+
+async def get_leaderboard() -> list:
+    leader_ids = [user_id for user_id, _ in all_time_leaderboard.get_top(10)]
+    leaders = await session.scalars(select(User).filter(User.id.in_(leader_ids)))
+
+    return sorted(leaders, key=lambda leader: leader_ids.index(leader.id))
 
 
 def is_user_banned(chat_id: int) -> bool:
-    user = get_user(chat_id)
-    return user.is_banned if user else False
+    return chat_id in banned_chat_ids
 
 
-def reset_spins_for_all_users(spins_amount):
-    session.execute(update(User).values(spins_limit=spins_amount, spins_left=spins_amount))
-    commit()
+async def set_user_banned(user: User, is_banned: bool):
+    user.is_banned = is_banned
+    await commit()
 
+    if is_banned:
+        banned_chat_ids.add(user.chat_id)
+    else:
+        banned_chat_ids.discard(user.chat_id)
 
-def record_user_spin(user: User):
-    user.spins_total += 1
-    user.spins_left -= 1
-    user.warning_level = 0
-    user.last_spin_time = datetime.utcnow()
 
-    if not user.next_refill_time:
-        user.next_refill_time = datetime.utcnow() + timedelta(hours=SPIN_REFILL_DELAY)
+async def set_chats_undeliverable(chat_ids):
+    if not chat_ids:
+        return
+
+    await session.execute(
+        update(User)
+        .filter(User.chat_id.in_(chat_ids), User.is_fake == False)
+        .values(is_undeliverable=True)
+        .execution_options(synchronize_session='fetch')
+    )
+    await commit()
+
+    for chat_id in chat_ids:
+        invalidate_cached_user(chat_id)
+
+
+async def set_user_deliverable(user: User):
+    user.is_undeliverable = False
+    await commit()
 
-    current_tournament = get_current_tournament()
-    if current_tournament:
-        current_tournament_stats = get_user_tournament_stats(user.id, current_tournament.id)
-        current_tournament_stats.spins += 1
 
-    commit()
+async def update_spins_limit_for_all_users(spins_amount: int) -> int:
+    now = datetime.utcnow()
 
+    result = await session.execute(
+        update(User)
+        .filter_by(is_fake=False, is_banned=False)
+        .filter(User.last_spin_time.is_not(None))
+        .filter(or_(User.last_spin_time > now - timedelta(hours=24), User.spins_limit != spins_amount))
+        .values(spins_limit=case(
+            (User.last_spin_time <= now - timedelta(hours=24), spins_amount),
+            else_=User.spins_limit + spins_amount
+        ))
+        .execution_options(synchronize_session=False)
+    )
+    await commit()
+    user_cache.clear()
+
+    return result.rowcount
+
+
+async def reset_spins_for_all_users(spins_amount):
+    await session.execute(update(User).values(spins_limit=spins_amount, spins_left=spins_amount))
+    await commit()
+    user_cache.clear()
+
+
+async def settle_user_spin(user: User, spin_reward: int, is_jackpot: bool) -> tuple[bool, UserTournamentStats | None]:
+    now = datetime.utcnow()
+    referral_reward = math.ceil(spin_reward * REFERRAL_GEMS_RATE)
+
+    settled_user = await session.scalar(
+        update(User)
+        .filter(User.id == user.id, User.spins_left > 0)
+        .values(
+            spins_total=User.spins_total + 1,
+            spins_left=User.spins_left - 1,
+            gems_total=User.gems_total + spin_reward,
+            jackpots_total=User.jackpots_total + int(is_jackpot),
+            warning_level=0,
+            last_spin_time=now,
+            next_warning_time=get_next_warning_time(now, 0),
+            next_refill_time=func.coalesce(User.next_refill_time, now + timedelta(hours=SPIN_REFILL_DELAY))
+        )
+        .returning(User),
+        execution_options={'populate_existing': True, 'synchronize_session': 'fetch'}
+    )
 
-def credit_user_spin_reward(user: User, spin_reward: int, is_jackpot: bool):
-    user.gems_total += spin_reward
-    if is_jackpot:
-        user.jackpots_total += 1
+    if not settled_user:
+        await session.refresh(user)
+        return False, None
+
+    current_tournament = await get_current_tournament()
+    current_tournament_stats = None
 
-    current_tournament = get_current_tournament()
     if current_tournament:
-        current_tournament_stats = get_user_tournament_stats(user.id, current_tournament.id)
-        current_tournament_stats.gems += spin_reward
-        if is_jackpot:
-            current_tournament_stats.jackpots += 1
+        current_tournament_stats = await increment_user_tournament_stats(user.id, current_tournament.id, gems=spin_reward, spins=1, jackpots=int(is_jackpot))
 
-    if user.referrer:
-        user.referrer.gems_total += math.ceil(spin_reward * REFERRAL_GEMS_RATE)
-        user.referrer.gems_referral += math.ceil(spin_reward * REFERRAL_GEMS_RATE)
+    referrer_gems_total, referrer_tournament_stats = None, None
+    if user.referrer_id and referral_reward:
+        referrer_gems_total = await session.scalar(
+            update(User)
+            .filter_by(id=user.referrer_id)
+            .values(gems_total=User.gems_total + referral_reward, gems_referral=User.gems_referral + referral_reward)
+            .returning(User.gems_total)
+        )
 
         if current_tournament:
-            referrer_tournament_stats = get_user_tournament_stats(user.referrer_id, current_tournament.id)
-            referrer_tournament_stats.gems += math.ceil(spin_reward * REFERRAL_GEMS_RATE)
+            referrer_tournament_stats = await increment_user_tournament_stats(user.referrer_id, current_tournament.id, gems=referral_reward)
+
+    await commit()
+
+    all_time_leaderboard.update(user.id, user.gems_total)
+    if current_tournament_stats:
+        tournament_leaderboard.update(user.id, current_tournament_stats.gems)
+
+    if referrer_gems_total is not None:
+        all_time_leaderboard.update(user.referrer_id, referrer_gems_total)
+    if referrer_tournament_stats:
+        tournament_leaderboard.update(user.referrer_id, referrer_tournament_stats.gems)
+
+    return True, current_tournament_stats
+
+
+async def settle_fake_autospins(autospins: list[tuple[User, int, int, int, datetime]]):
+    now = datetime.utcnow()
+    current_tournament = await get_current_tournament()
+
+    settled = []
+    for user, spins, gems, jackpots, next_autospin_time in autospins:
+        gems_total = await session.scalar(
+            update(User)
+            .filter_by(id=user.id)
+            .values(
+                spins_total=User.spins_total + spins,
+                gems_total=User.gems_total + gems,
+                jackpots_total=User.jackpots_total + jackpots,
+                spins_left=DEFAULT_SPINS_AMOUNT,
+                last_spin_time=now,
+                next_autospin_time=next_autospin_time
+            )
+            .returning(User.gems_total),
+            execution_options={'synchronize_session': False}
+        )
+
+        tournament_stats = None
+        if current_tournament:
+            tournament_stats = await increment_user_tournament_stats(user.id, current_tournament.id, gems=gems, spins=spins, jackpots=jackpots)
 
-    commit()
+        settled.append((user.id, gems_total, tournament_stats))
 
+    await commit()
 
-def get_referral_spins_bonus(user: User) -> int:
-    current_tournament = get_current_tournament()
+    for user_id, gems_total, tournament_stats in settled:
+        all_time_leaderboard.update(user_id, gems_total)
+        if tournament_stats:
+            tournament_leaderboard.update(user_id, tournament_stats.gems)
+
+
+async def get_referral_spins_bonus(user: User) -> int:
+    current_tournament = await get_current_tournament()
     if not current_tournament:
         return 0
 
-    return sum(
-        DEFAULT_SPINS_AMOUNT
-        for referral in user.referrals
-        if get_user_tournament_stats(referral.id, current_tournament.id).spins > 0
+    active_referrals = await session.scalar(
+        select(func.count())
+        .select_from(User)
+        .join(UserTournamentStats, UserTournamentStats.user_id == User.id)
+        .filter(User.referrer_id == user.id, UserTournamentStats.tournament_id == current_tournament.id, UserTournamentStats.spins > 0)
     )
 
+    return active_referrals * DEFAULT_SPINS_AMOUNT
+
 
-def start_new_tournament() -> Tournament:
-    current_tournament = get_current_tournament()
+async def start_new_tournament() -> Tournament:
+    current_tournament = await get_current_tournament()
     if current_tournament:
         return current_tournament
 
@@ -116,47 +364,243 @@ def start_new_tournament() -> Tournament:
 
     new_tournament = Tournament(start_date=start_date, end_date=end_date, is_active=True)
     session.add(new_tournament)
-    commit()
+    await session.flush()
 
+    await create_tournament_stats(new_tournament.id)
+    await commit()
+
+    current_tournament_cache.invalidate()
+    tournament_leaderboard.clear()
     return new_tournament
 
 
-def get_tournament(tournament_id: int) -> Tournament:
-    return session.get(Tournament, tournament_id)  # type: ignore
+async def get_tournament(tournament_id: int) -> Tournament:
+    return await session.get(Tournament, tournament_id)  # type: ignore
+
+
+async def get_current_tournament() -> Tournament:
+    if not current_tournament_cache.is_loaded:
+        current_tournament = await session.scalar(select(Tournament).filter_by(is_active=True).limit(1))
+        if current_tournament:
+            session.expunge(current_tournament)
 
+        current_tournament_cache.set(current_tournament)
 
-def get_current_tournament() -> Tournament:
-    return session.query(Tournament).filter_by(is_active=True).first()  # type: ignore
+    return current_tournament_cache.tournament  # type: ignore
 
 
-def end_current_tournament() -> Tournament:
-    current_tournament = get_current_tournament()
+async def end_current_tournament(create_notifications) -> tuple[Tournament | None, list]:
+    current_tournament = await get_current_tournament()
+    winners, referrer_gems_totals = [], []
+
     if current_tournament:
+        await session.execute(update(Tournament).filter_by(id=current_tournament.id).values(is_active=False))
+
+        winners = (await get_tournament_leaderboard(current_tournament.id))[:3]
+        if winners:
+            referrer_gems_totals = await settle_tournament_winners(winners)
+            await enqueue_outbox_messages(await create_notifications(current_tournament, winners))
+
+        await commit()
+
         current_tournament.is_active = False
-        commit()
 
-    return current_tournament
+    for referrer_id, gems_total in referrer_gems_totals:
+        all_time_leaderboard.update(referrer_id, gems_total)
+
+    current_tournament_cache.invalidate()
+    tournament_leaderboard.clear()
+    user_cache.clear()
+    return current_tournament, winners
+
+
+async def settle_tournament_winners(winners: list[UserTournamentStats]) -> list[tuple[int, int]]:
+    first_place_id = winners[0].user_id
+    winner_ids = [stats.user_id for stats in winners]
+
+    await session.execute(
+        update(User)
+        .filter_by(is_banned=False)
+        .filter(User.id != first_place_id, or_(User.tournament_king_wins != 0, User.is_previous_tournament_winner))
+        .values(tournament_king_wins=0, is_previous_tournament_winner=False)
+        .execution_options(synchronize_session=False)
+    )
+
+    await session.execute(
+        update(User)
+        .filter_by(is_banned=False)
+        .filter(User.id.in_(winner_ids))
+        .values(tournament_wins=User.tournament_wins + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+    king_wins = User.tournament_king_wins + 1
+    await session.execute(
+        update(User)
+        .filter_by(id=first_place_id, is_banned=False)
+        .values(
+            tournament_king_wins=case((User.is_previous_tournament_winner, king_wins), else_=User.tournament_king_wins),
+            max_tournament_king_wins=case(
+                (User.is_previous_tournament_winner & (User.max_tournament_king_wins < king_wins), king_wins),
+                else_=User.max_tournament_king_wins
+            ),
+            is_previous_tournament_winner=True
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    referrer_gems_totals = []
+    for stats in winners:
+        if stats.user.is_banned or not stats.user.referrer_id:
+            continue
+
+        gems_total = await session.scalar(
+            update(User)
+            .filter_by(id=stats.user.referrer_id)
+            .values(gems_total=User.gems_total + math.ceil(stats.gems * REFERRAL_GEMS_RATE))
+            .returning(User.gems_total),
+            execution_options={'synchronize_session': False}
+        )
+        referrer_gems_totals.append((stats.user.referrer_id, gems_total))
+
+    return referrer_gems_totals
+
+
+async def get_current_tournament_leaderboard() -> list[tuple[User, int]]:
+    leaders = tournament_leaderboard.get_top(10)
+    users = {user.id: user for user in await session.scalars(select(User).filter(User.id.in_([user_id for user_id, _ in leaders])))}
+
+    return [(users[user_id], gems) for user_id, gems in leaders if user_id in users]
+
+
+async def get_tournament_leaderboard(tournament_id: int) -> list:
+    return list(await session.scalars(
+        select(UserTournamentStats)
+        .options(selectinload(UserTournamentStats.user))
+        .filter_by(tournament_id=tournament_id)
+        .filter(UserTournamentStats.gems > 0)
+        .order_by(UserTournamentStats.gems.desc())
+        .limit(10)
+    ))
+
+
+def insert(table):
+    if engine.dialect.name == 'postgresql':
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+async def increment_user_tournament_stats(user_id: int, tournament_id: int, **increments) -> UserTournamentStats:
+    statement = insert(UserTournamentStats).values(user_id=user_id, tournament_id=tournament_id, **increments)
+    statement = statement.on_conflict_do_update(
+        index_elements=[UserTournamentStats.user_id, UserTournamentStats.tournament_id],
+        set_={key: getattr(UserTournamentStats, key) + statement.excluded[key] for key in increments}
+    )
+
+    return await session.scalar(statement.returning(UserTournamentStats), execution_options={'populate_existing': True})
+
+
+async def get_user_tournament_stats(user_id: int, tournament_id: int) -> UserTournamentStats:
+    stats = await session.get(UserTournamentStats, (user_id, tournament_id))
+    return stats or UserTournamentStats(user_id=user_id, tournament_id=tournament_id, gems=0, spins=0, jackpots=0, is_email_sent=False)
+
+
+async def get_or_create_user_tournament_stats(user_id: int, tournament_id: int) -> UserTournamentStats:
+    stats = await session.get(UserTournamentStats, (user_id, tournament_id))
+    if stats:
+        return stats
+
+    stats = await session.scalar(
+        insert(UserTournamentStats)
+        .values(user_id=user_id, tournament_id=tournament_id)
+        .on_conflict_do_nothing()
+        .returning(UserTournamentStats)
+    )
+
+    return stats or await session.get(UserTournamentStats, (user_id, tournament_id))  # type: ignore
+
+
+async def create_tournament_stats(tournament_id: int):
+    await session.execute(
+        insert(UserTournamentStats)
+        .from_select(
+            ['user_id', 'tournament_id'],
+            select(User.id, literal(tournament_id)).filter(or_(User.is_fake.is_(False), User.is_active.is_(True)), User.is_banned.is_(False))
+        )
+        .on_conflict_do_nothing()
+    )
+
+
+async def create_fake_users(amount):
+    session.add_all([User(username="Bot", is_fake=True) for _ in range(amount)])
+    await commit()
+
+
+async def enqueue_outbox_messages(messages: list[dict]):
+    if messages:
+        await session.execute(insert(OutboxMessage), messages)
+
+
+async def get_pending_outbox_messages(limit: int) -> list:
+    return list(await session.scalars(
+        select(OutboxMessage)
+        .filter(OutboxMessage.sent_at.is_(None))
+        .order_by(OutboxMessage.priority.desc(), OutboxMessage.id)
+        .limit(limit)
+    ))
+
+
+async def mark_outbox_messages_sent(delivered_ids: list[int], failed_ids: list[int]):
+    now = datetime.utcnow()
+
+    if delivered_ids:
+        await session.execute(update(OutboxMessage).filter(OutboxMessage.id.in_(delivered_ids)).values(sent_at=now, is_delivered=True))
+    if failed_ids:
+        await session.execute(update(OutboxMessage).filter(OutboxMessage.id.in_(failed_ids)).values(sent_at=now, is_delivered=False))
+
+    await commit()
+
+
+async def get_outbox_progress(broadcast: str) -> dict:
+    total, sent, delivered = (await session.execute(
+        select(func.count(OutboxMessage.id), func.count(OutboxMessage.sent_at), func.count(OutboxMessage.id).filter(OutboxMessage.is_delivered.is_(True)))
+        .filter(OutboxMessage.broadcast == broadcast)
+    )).one()
+
+    return {'total': total, 'sent': sent, 'delivered': delivered, 'pending': total - sent}
+
+
+async def add_winner_submission(user_id: int, tournament_id: int, row: dict):
+    session.add(WinnerSubmission(user_id=user_id, tournament_id=tournament_id, row=row))
+    await commit()
 
 
-def get_tournament_leaderboard(tournament_id: int) -> list:
-    return session.query(UserTournamentStats).filter_by(tournament_id=tournament_id).filter(UserTournamentStats.gems > 0).order_by(UserTournamentStats.gems.desc()).limit(10).all()
+async def get_pending_winner_submissions(limit: int, now: datetime) -> list:
+    return list(await session.scalars(
+        select(WinnerSubmission)
+        .filter(WinnerSubmission.submitted_at.is_(None), or_(WinnerSubmission.next_attempt_at.is_(None), WinnerSubmission.next_attempt_at <= now))
+        .order_by(WinnerSubmission.attempts, WinnerSubmission.id)
+        .limit(limit)
+    ))
 
 
-def get_user_tournament_stats(user_id: int, tournament_id: int) -> UserTournamentStats:
-    stats = session.query(UserTournamentStats).filter_by(user_id=user_id, tournament_id=tournament_id).first()
+async def mark_winner_submissions(submissions: list, is_submitted: bool):
+    now = datetime.utcnow()
 
-    if not stats:
-        stats = UserTournamentStats(user_id=user_id, tournament_id=tournament_id)
-        session.add(stats)
-        commit()
+    for submission in submissions:
+        if is_submitted:
+            submission.submitted_at = now
+        else:
+            submission.attempts += 1
+            submission.next_attempt_at = get_next_submission_attempt_time(submission.attempts, now)
 
-    return stats
+    await commit()
 
 
-def create_fake_users(amount):
-    session.bulk_save_objects([User(username="Bot", is_fake=True) for _ in range(amount)])
-    commit()
+async def postpone_winner_submissions(submissions: list):
+    now = datetime.utcnow()
 
+    for submission in submissions:
+        submission.next_attempt_at = get_next_submission_attempt_time(submission.attempts + 1, now)
 
-if not session.query(User).first():
-    create_fake_users(FAKE_USERS_AMOUNT)
+    await commit()
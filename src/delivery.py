@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest, TelegramNetworkError, TelegramServerError
+from cachetools import TTLCache
+
+from src.config import DELIVERY_MAX_RETRIES, DELIVERY_BACKOFF_BASE, DELIVERY_GLOBAL_PAUSE_CHATS, DELIVERY_GLOBAL_PAUSE_WINDOW
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.max_rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def slow_down(self):
+        self.rate = max(self.max_rate / 8, self.rate / 2)
+
+    def speed_up(self):
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+
+class Delivery:
+    def __init__(self, max_retries: int, backoff_base: float, global_pause_chats: int, global_pause_window: float):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.global_pause_chats = global_pause_chats
+        self.paused_until = 0
+        self.chat_paused_until = TTLCache(maxsize=100000, ttl=3600)
+        self.retry_after_chat_ids = TTLCache(maxsize=100000, ttl=global_pause_window)
+        self.counters = Counter()
+        self.undeliverable_chat_ids = set()
+
+    async def wait(self, chat_id: int):
+        ready_at = max(self.paused_until, self.chat_paused_until.get(chat_id, 0))
+        delay = ready_at - time.monotonic()
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float):
+        self.counters['global_pause'] += 1
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def pause_chat(self, chat_id: int, seconds: float):
+        self.chat_paused_until[chat_id] = time.monotonic() + seconds
+
+        self.retry_after_chat_ids[chat_id] = True
+        self.retry_after_chat_ids.expire()
+        if len(self.retry_after_chat_ids) >= self.global_pause_chats:
+            self.retry_after_chat_ids.clear()
+            self.pause(seconds)
+
+    def pop_undeliverable_chat_ids(self) -> set:
+        chat_ids, self.undeliverable_chat_ids = self.undeliverable_chat_ids, set()
+        return chat_ids
+
+    async def deliver(self, chat_id: int, request, bucket: TokenBucket = None):
+        for attempt in range(self.max_retries + 1):
+            await self.wait(chat_id)
+            if bucket:
+                await bucket.acquire()
+
+            try:
+                result = await request()
+            except TelegramRetryAfter as error:
+                self.counters['retry_after'] += 1
+                self.pause_chat(chat_id, error.retry_after)
+                if bucket:
+                    bucket.slow_down()
+            except TelegramForbiddenError:
+                self.counters['forbidden'] += 1
+                self.undeliverable_chat_ids.add(chat_id)
+                return None
+            except TelegramBadRequest as error:
+                self.counters['bad_request'] += 1
+                if 'chat not found' in error.message.lower():
+                    self.undeliverable_chat_ids.add(chat_id)
+                return None
+            except (TelegramNetworkError, TelegramServerError):
+                self.counters['network_error'] += 1
+                await asyncio.sleep(self.backoff_base * 2 ** attempt * random.uniform(0.5, 1.5))
+            except Exception:
+                self.counters['failed'] += 1
+                logging.exception("Telegram request to %s failed", chat_id)
+                return None
+            else:
+                self.counters['delivered'] += 1
+                if bucket:
+                    bucket.speed_up()
+                return result
+
+        self.counters['dropped'] += 1
+        return None
+
+
+delivery = Delivery(DELIVERY_MAX_RETRIES, DELIVERY_BACKOFF_BASE, DELIVERY_GLOBAL_PAUSE_CHATS, DELIVERY_GLOBAL_PAUSE_WINDOW)
@@ -15,14 +15,16 @@ from aiogram.types import Message
 from async_lru import alru_cache
 
 from src import translations
-from src.config import BOT_TOKEN, SPIN_REWARDS, MAIN_GROUP_ID, WIN_EMOJIS, GAME_TOPIC_ID, FEEDBACK_TOPIC_ID, WINNERS_SHEET_NAME, FEEDBACK_TOPIC_URL, DEFAULT_SPINS_AMOUNT, MAIN_GROUP_URL, BONUS_CHANNELS
+from src.config import BOT_TOKEN, SPIN_REWARDS, MAIN_GROUP_ID, WIN_EMOJIS, GAME_TOPIC_ID, FEEDBACK_TOPIC_ID, FEEDBACK_TOPIC_URL, DEFAULT_SPINS_AMOUNT, MAIN_GROUP_URL, BONUS_CHANNELS
+from src.delivery import delivery
 from src.images import get_referral_image
+from src.leaderboards import all_time_leaderboard, tournament_leaderboard
 from src.keyboards import *
+from src.middlewares import UserMiddleware
 from src.models import User
-from src.sheets import add_to_google_sheet
 from src.states import AnonChatState, SendEmailState, ClearStateMiddleware
 from src.translations import _
-from src.utils import get_spin_result, format_spin_result, get_spin_win_text, is_valid_email, format_tournament_info, format_refill_time_info, format_admin_user_info, format_next_refill_time, generate_random_name, format_channels_info
+from src.utils import get_spin_result, format_spin_result, get_spin_win_text, is_valid_email, format_tournament_info, format_refill_time_info, format_admin_user_info, format_next_refill_time, generate_random_name, format_channels_info, format_leaderboard_position
 
 bot = Bot(BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML, link_preview_is_disabled=True, link_preview_show_above_text=True, show_caption_above_media=False))
 router = Router()
@@ -36,10 +38,13 @@ router.callback_query.filter(F.from_user.func(lambda user: not database.is_user_
 router.message.middleware(ClearStateMiddleware())
 router.callback_query.middleware(ClearStateMiddleware())
 
+router.message.middleware(UserMiddleware())
+router.callback_query.middleware(UserMiddleware())
+router.inline_query.middleware(UserMiddleware())
+
 
 @router.message(CommandStart())
-async def start_command(message: Message, command: CommandObject):
-    user = database.get_user(message.from_user.id)
+async def start_command(message: Message, command: CommandObject, user: User):
     if not user:
         adv_source, referrer_id = None, None
 
@@ -49,10 +54,11 @@ async def start_command(message: Message, command: CommandObject):
             elif command.args.startswith('r'):
                 referrer_id = int(command.args[1:])
 
-        referrer = database.get_user_by_id(referrer_id) if referrer_id else None
+        referrer = await database.get_user_by_id(referrer_id) if referrer_id else None
         if referrer:
             referrer.spins_left += DEFAULT_SPINS_AMOUNT
-            database.commit()
+            await database.commit()
+            database.invalidate_cached_user(referrer.chat_id)
 
             await send_message(referrer.chat_id, _("spins_refilled_referral", referrer.language))
 
@@ -63,10 +69,10 @@ async def start_command(message: Message, command: CommandObject):
             adv_source=adv_source,
             referrer_id=referrer_id if referrer else None
         )
-        database.add_user(user)
+        await database.add_user(user)
 
     if command.args and command.args.startswith('u'):
-        target = database.get_user_by_id(int(command.args[1:]))
+        target = await database.get_user_by_id(int(command.args[1:]))
         if target:
             await send_user_info_message(message, user, target)
             return
@@ -75,8 +81,7 @@ async def start_command(message: Message, command: CommandObject):
 
 
 @router.message(Command("iguild"))
-async def iguild_command(message: Message):
-    user = database.get_user(message.from_user.id)
+async def iguild_command(message: Message, user: User):
     if user:
         await send_iguild_message(message, user)
 
@@ -88,29 +93,25 @@ async def reset_command(message: Message, state: FSMContext):
 
 
 @router.message(Command("pass"))
-async def pass_command(message: Message):
-    user = database.get_user(message.from_user.id)
+async def pass_command(message: Message, user: User):
     if user:
         await send_igaming_pass_message(message, user)
 
 
 @router.message(Command("ref"))
-async def ref_command(message: Message):
-    user = database.get_user(message.from_user.id)
+async def ref_command(message: Message, user: User):
     if user:
         await send_referral_message(message, user)
 
 
 @router.message(Command("bonus"))
-async def ref_command(message: Message):
-    user = database.get_user(message.from_user.id)
+async def ref_command(message: Message, user: User):
     if user:
         await send_bonus_message(message, user)
 
 
 @router.message(Command("anon"))
-async def anon_command(message: Message, state: FSMContext):
-    user = database.get_user(message.from_user.id)
+async def anon_command(message: Message, state: FSMContext, user: User):
     if not user:
         return
 
@@ -123,58 +124,51 @@ async def anon_command(message: Message, state: FSMContext):
 
 
 @router.message(Command("spin"))
-async def spin_command(message: Message):
-    user = database.get_user(message.from_user.id)
+async def spin_command(message: Message, user: User):
     if user and await check_can_spin(message, user):
         spin_message = await message.answer_dice("🎰", reply_markup=create_play_keyboard(user.language))
         await handle_spin_result(spin_message, user)
 
 
 @router.callback_query(F.data.startswith("select_language_"))
-async def select_language_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def select_language_callback(callback: CallbackQuery, user: User):
     if user:
         user.language = callback.data[len('select_language_'):]
-        database.commit()
+        await database.commit()
 
         await send_iguild_message(callback.message, user)
 
 
 @router.callback_query(F.data == "start")
-async def start_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def start_callback(callback: CallbackQuery, user: User):
     if user:
         await send_start_message(callback.message)
 
 
 @router.callback_query(F.data == "iguild")
-async def iguild_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def iguild_callback(callback: CallbackQuery, user: User):
     if user:
         await send_iguild_message(callback.message, user)
 
 
 @router.callback_query(F.data == "weekly_challenge")
-async def weekly_challenge_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def weekly_challenge_callback(callback: CallbackQuery, user: User):
     if user:
         await send_weekly_challenge_message(callback.message, user)
 
 
 @router.callback_query(F.data == "winning_schemes")
-async def winning_schemes_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def winning_schemes_callback(callback: CallbackQuery, user: User):
     if user:
         await send_winning_schemes_message(callback.message, user)
 
 
 @router.callback_query(F.data == "leaderboard")
-async def leaderboard_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def leaderboard_callback(callback: CallbackQuery, user: User):
     if not user:
         return
 
-    current_tournament = database.get_current_tournament()
+    current_tournament = await database.get_current_tournament()
     if not current_tournament:
         await send_leaderboard_message(callback.message, user)
     else:
@@ -182,68 +176,59 @@ async def leaderboard_callback(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "leaderboard_all_time")
-async def leaderboard_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def leaderboard_callback(callback: CallbackQuery, user: User):
     if user:
         await send_leaderboard_message(callback.message, user, edit_original=True)
 
 
 @router.callback_query(F.data == "leaderboard_weekly")
-async def leaderboard_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def leaderboard_callback(callback: CallbackQuery, user: User):
     if user:
         await send_leaderboard_weekly_message(callback.message, user, edit_original=True)
 
 
 @router.callback_query(F.data == "igaming_pass")
-async def igaming_pass_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def igaming_pass_callback(callback: CallbackQuery, user: User):
     if user:
         await send_igaming_pass_message(callback.message, user)
 
 
 @router.callback_query(F.data == "play")
-async def play_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def play_callback(callback: CallbackQuery, user: User):
     if user and await check_can_spin(callback.message, user):
         spin_message = await callback.message.answer_dice("🎰", reply_markup=create_play_keyboard(user.language))
         await handle_spin_result(spin_message, user)
 
 
 @router.callback_query(F.data == "referral")
-async def referral_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def referral_callback(callback: CallbackQuery, user: User):
     if user:
         await send_referral_message(callback.message, user)
 
 
 @router.callback_query(F.data == "bonus")
-async def bonus_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def bonus_callback(callback: CallbackQuery, user: User):
     if user:
         await send_bonus_message(callback.message, user)
 
 
 @router.callback_query(F.data == "anon_chat")
-async def anon_chat_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def anon_chat_callback(callback: CallbackQuery, user: User):
     if user:
         await send_anon_chat_message(callback.message, user)
 
 
 @router.callback_query(F.data == "update_name")
-async def update_name_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def update_name_callback(callback: CallbackQuery, user: User):
     if user:
         user.anon_name = generate_random_name()
-        database.commit()
+        await database.commit()
 
         await send_anon_chat_message(callback.message, user)
 
 
 @router.callback_query(F.data == "anon_chat_start")
-async def anon_chat_start_callback(callback: CallbackQuery, state: FSMContext):
-    user = database.get_user(callback.from_user.id)
+async def anon_chat_start_callback(callback: CallbackQuery, state: FSMContext, user: User):
     if not user or user.is_muted:
         return
 
@@ -252,16 +237,15 @@ async def anon_chat_start_callback(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data.startswith("send_email_"))
-async def send_email_callback(callback: CallbackQuery, state: FSMContext):
-    user = database.get_user(callback.from_user.id)
+async def send_email_callback(callback: CallbackQuery, state: FSMContext, user: User):
     if not user:
         return
 
-    tournament = database.get_tournament(callback.data[len('send_email_'):])
+    tournament = await database.get_tournament(int(callback.data[len('send_email_'):]))
     if not tournament:
         return
 
-    tournament_stats = database.get_user_tournament_stats(user.id, tournament.id)
+    tournament_stats = await database.get_user_tournament_stats(user.id, tournament.id)
     if tournament_stats.is_email_sent:
         await callback.message.answer(_("send_email_already_sent", user.language), reply_markup=create_back_iguild_keyboard(user.language))
         return
@@ -272,36 +256,34 @@ async def send_email_callback(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data.startswith("mute_"))
-async def mute_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def mute_callback(callback: CallbackQuery, user: User):
     if not user or not user.is_admin:
         return
 
-    target = database.get_user_by_id(callback.data[len("mute_"):])
+    target = await database.get_user_by_id(int(callback.data[len("mute_"):]))
     if not target or target.is_admin or target.is_fake:
         await callback.message.answer_or_edit(_("mute_invalid_target", user.language))
         return
 
     target.is_muted = not target.is_muted
-    database.commit()
+    await database.commit()
+    database.invalidate_cached_user(target.chat_id)
 
     await send_message(target.chat_id, _("mute_info" if target.is_muted else "unmute_info", target.language))
     await callback.message.answer_or_edit(_("mute_success" if target.is_muted else "unmute_success", user.language, anon_name=target.mention_anon_name()), reply_markup=create_back_iguild_keyboard(user.language))
 
 
 @router.callback_query(F.data.startswith("ban_"))
-async def ban_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def ban_callback(callback: CallbackQuery, user: User):
     if not user or not user.is_admin:
         return
 
-    target = database.get_user_by_id(callback.data[len("ban_"):])
+    target = await database.get_user_by_id(int(callback.data[len("ban_"):]))
     if not target or target.is_admin or target.is_fake:
         await callback.message.answer_or_edit(_("ban_invalid_target", user.language))
         return
 
-    target.is_banned = not target.is_banned
-    database.commit()
+    await database.set_user_banned(target, not target.is_banned)
 
     if target.is_banned:
         await bot.send_message(target.chat_id, _("ban_info", target.language))
@@ -314,23 +296,20 @@ async def ban_callback(callback: CallbackQuery):
 
 
 @router.message(F.text.in_(translations.get_all_translations("play")))
-async def play_message_handler(message: Message):
-    user = database.get_user(message.from_user.id)
+async def play_message_handler(message: Message, user: User):
     if user and await check_can_spin(message, user):
         spin_message = await message.answer_dice("🎰")
         await handle_spin_result(spin_message, user)
 
 
 @router.message(F.dice.emoji == "🎰")
-async def slots_dice_handler(message: Message):
-    user = database.get_user(message.from_user.id)
+async def slots_dice_handler(message: Message, user: User):
     if user and await check_can_spin(message, user):
         await handle_spin_result(message, user)
 
 
 @router.message(AnonChatState.message)
-async def anon_chat_message_handler(message: Message):
-    user = database.get_user(message.from_user.id)
+async def anon_chat_message_handler(message: Message, user: User):
     if not user or user.is_muted:
         return
 
@@ -359,8 +338,7 @@ async def anon_chat_message_handler(message: Message):
 
 
 @router.callback_query(F.data == "send")
-async def send_callback(callback: CallbackQuery):
-    user = database.get_user(callback.from_user.id)
+async def send_callback(callback: CallbackQuery, user: User):
     if not user or user.is_muted:
         return
 
@@ -387,8 +365,7 @@ async def send_callback(callback: CallbackQuery):
 
 
 @router.message(SendEmailState.email)
-async def send_email_message_handler(message: Message, state: FSMContext):
-    user = database.get_user(message.from_user.id)
+async def send_email_message_handler(message: Message, state: FSMContext, user: User):
     if not user:
         return
 
@@ -398,15 +375,14 @@ async def send_email_message_handler(message: Message, state: FSMContext):
         return
 
     data = await state.get_data()
-    tournament = database.get_tournament(data["tournament_id"])
+    tournament = await database.get_tournament(data["tournament_id"])
 
-    tournament_stats = database.get_user_tournament_stats(user.id, tournament.id)
+    tournament_stats = await database.get_or_create_user_tournament_stats(user.id, tournament.id)
     tournament_stats.is_email_sent = True
 
     user.email = message.text
-    database.commit()
 
-    data = {
+    row = {
         'Username': user.username,
         'ID': user.chat_id,
         'Anon Name': user.anon_name,
@@ -417,18 +393,14 @@ async def send_email_message_handler(message: Message, state: FSMContext):
         'Tournament Gems': tournament_stats.gems
     }
 
-    if not add_to_google_sheet(WINNERS_SHEET_NAME, data):
-        await message.answer(_("send_email_error", user.language), reply_markup=create_back_iguild_keyboard(user.language))
-        await state.clear()
-        return
+    await database.add_winner_submission(user.id, tournament.id, row)
 
     await message.answer(_("send_email_sent", user.language), reply_markup=create_back_iguild_keyboard(user.language))
     await state.clear()
 
 
 @router.inline_query()
-async def share_results_inline_query(inline: InlineQuery):
-    user = database.get_user(inline.from_user.id)
+async def share_results_inline_query(inline: InlineQuery, user: User):
     if not user:
         return
 
@@ -476,7 +448,7 @@ async def send_winning_schemes_message(message: Message, user: User):
 
 
 async def send_leaderboard_message(message: Message, user: User, edit_original=False):
-    leaderboard = database.get_leaderboard()
+    leaderboard = await database.get_leaderboard()
     leaderboard_text = ""
 
     for leader in leaderboard:
@@ -487,7 +459,7 @@ async def send_leaderboard_message(message: Message, user: User, edit_original=F
 
     if user not in leaderboard:
         if leaderboard:
-            leaderboard_text += "<b>***</b>\n"
+            leaderboard_text += f"<b>{format_leaderboard_position(all_time_leaderboard.get_rank(user.id), len(all_time_leaderboard), user.language)}</b>\n"
         leaderboard_text += f"<b>{user.gems_total} 💎 {user.format_anon_name(with_icon=False)}</b> 🥷\n"
 
     await message.answer_or_edit(
@@ -499,29 +471,29 @@ async def send_leaderboard_message(message: Message, user: User, edit_original=F
           tournament_wins=user.tournament_wins,
           tournament_king_wins=user.max_tournament_king_wins,
           leaderboard_text=leaderboard_text),
-        reply_markup=create_leaderboard_keyboard(user.language),
+        reply_markup=await create_leaderboard_keyboard(user.language),
         edit_original=edit_original
     )
 
 
 async def send_leaderboard_weekly_message(message: Message, user: User, edit_original=False):
-    current_tournament = database.get_current_tournament()
+    current_tournament = await database.get_current_tournament()
     if not current_tournament:
         return
 
-    leaderboard = database.get_tournament_leaderboard(current_tournament.id)
+    leaderboard = await database.get_current_tournament_leaderboard()
     leaderboard_text = ""
 
-    for stats in leaderboard:
-        if stats.user == user:
-            leaderboard_text += f"<b>{stats.gems} 💎 {stats.user.format_anon_name(with_icon=False)}</b> 🥷\n"
+    for leader, gems in leaderboard:
+        if leader == user:
+            leaderboard_text += f"<b>{gems} 💎 {leader.format_anon_name(with_icon=False)}</b> 🥷\n"
         else:
-            leaderboard_text += f"{stats.gems} 💎 {stats.user.format_anon_name(with_icon=False)}\n"
+            leaderboard_text += f"{gems} 💎 {leader.format_anon_name(with_icon=False)}\n"
 
-    current_tournament_stats = database.get_user_tournament_stats(user.id, current_tournament.id)
-    if current_tournament_stats not in leaderboard:
+    current_tournament_stats = await database.get_user_tournament_stats(user.id, current_tournament.id)
+    if user not in [leader for leader, _ in leaderboard]:
         if leaderboard:
-            leaderboard_text += "<b>***</b>\n"
+            leaderboard_text += f"<b>{format_leaderboard_position(tournament_leaderboard.get_rank(user.id), len(tournament_leaderboard), user.language)}</b>\n"
         leaderboard_text += f"<b>{current_tournament_stats.gems} 💎 {user.format_anon_name(with_icon=False)}</b> 🥷\n"
 
     await message.answer_or_edit(
@@ -533,14 +505,14 @@ async def send_leaderboard_weekly_message(message: Message, user: User, edit_ori
           spins_limit=await get_bonus_spins_limit(user),
           refill_time_info=format_refill_time_info(user),
           leaderboard_text=leaderboard_text),
-        reply_markup=create_weekly_leaderboard_keyboard(user.language),
+        reply_markup=await create_weekly_leaderboard_keyboard(user.language),
         edit_original=edit_original
     )
 
 
 async def send_user_info_message(message: Message, user: User, target: User):
-    current_tournament = database.get_current_tournament()
-    current_tournament_stats = database.get_user_tournament_stats(target.id, current_tournament.id) if current_tournament else None
+    current_tournament = await database.get_current_tournament()
+    current_tournament_stats = await database.get_user_tournament_stats(target.id, current_tournament.id) if current_tournament else None
 
     await message.answer(
         _("user_info", user.language,
@@ -564,7 +536,7 @@ async def send_igaming_pass_message(message: Message, user: User):
 
 
 async def send_referral_message(message: Message, user: User):
-    referrals = sorted(user.referrals, key=lambda referral: referral.gems_total, reverse=True)
+    referrals = sorted(await user.awaitable_attrs.referrals, key=lambda referral: referral.gems_total, reverse=True)
     referrals_text = ""
 
     for referral in referrals[:10]:
@@ -596,7 +568,7 @@ async def send_referral_message(message: Message, user: User):
 
 async def send_bonus_message(message: Message, user: User):
     channels = [
-        {**channel, 'subscribed': await is_subscribed(user, channel['id'])}
+        {**channel, 'subscribed': await is_subscribed(user.chat_id, channel['id'])}
         for channel in BONUS_CHANNELS
     ]
 
@@ -640,15 +612,18 @@ async def send_send_email_message(message: Message, user: User):
     await message.answer_or_edit(_("send_email_info", user.language), image_path="assets/images/add_your_email.png", delete_original=False)
 
 
+async def send_no_spins_left_message(message: Message, user: User):
+    current_tournament = await database.get_current_tournament()
+    current_tournament_stats = await database.get_user_tournament_stats(user.id, current_tournament.id) if current_tournament else None
+
+    await message.answer(_("no_spins_left", user.language, next_refill_time=format_next_refill_time(user), tournament_info=format_tournament_info(user, current_tournament_stats)), reply_markup=create_no_spins_left_keyboard(user.language))
+
+
 async def check_can_spin(message: Message, user: User):
     if user.spins_left > 0:
-        database.record_user_spin(user)
         return True
 
-    current_tournament = database.get_current_tournament()
-    current_tournament_stats = database.get_user_tournament_stats(user.id, current_tournament.id) if current_tournament else None
-
-    await message.answer(_("no_spins_left", user.language, next_refill_time=format_next_refill_time(user), tournament_info=format_tournament_info(user, current_tournament_stats)), reply_markup=create_no_spins_left_keyboard(user.language))
+    await send_no_spins_left_message(message, user)
     return False
 
 
@@ -656,10 +631,10 @@ async def handle_spin_result(message: Message, user: User):
     spin_result = get_spin_result(message.dice.value)
     spin_reward = SPIN_REWARDS.get(spin_result, 0)
 
-    database.credit_user_spin_reward(user, spin_reward, spin_result == "777")
-
-    current_tournament = database.get_current_tournament()
-    current_tournament_stats = database.get_user_tournament_stats(user.id, current_tournament.id) if current_tournament else None
+    is_settled, current_tournament_stats = await database.settle_user_spin(user, spin_reward, spin_result == "777")
+    if not is_settled:
+        await send_no_spins_left_message(message, user)
+        return
 
     if spin_reward:
         await message.answer(
@@ -693,22 +668,22 @@ async def handle_spin_result(message: Message, user: User):
 
 
 @alru_cache(ttl=5)
-async def is_subscribed(user: User, channel_id: int) -> bool:
+async def is_subscribed(chat_id: int, channel_id: int) -> bool:
     with suppress(Exception):
-        chat_member = await bot.get_chat_member(channel_id, user.chat_id)
+        chat_member = await bot.get_chat_member(channel_id, chat_id)
         return chat_member.status not in {'left', 'kicked'}
 
 
 async def get_subscription_spins_bonus(user: User) -> int:
     total_spins = 0
     for channel in BONUS_CHANNELS:
-        if await is_subscribed(user, channel['id']):
+        if await is_subscribed(user.chat_id, channel['id']):
             total_spins += DEFAULT_SPINS_AMOUNT
     return total_spins
 
 
 async def get_bonus_spins_limit(user: User) -> int:
-    referral_spins_bonus = database.get_referral_spins_bonus(user)
+    referral_spins_bonus = await database.get_referral_spins_bonus(user)
     subscription_bonus = await get_subscription_spins_bonus(user)
 
     return user.spins_limit + referral_spins_bonus + subscription_bonus
@@ -753,10 +728,8 @@ async def send_group_message(topic_id: int, text: str, image_path: str = None, *
 
 
 async def send_message(chat_id: int, text: str, **kwargs) -> Message | None:
-    with suppress(Exception):
-        return await bot.send_message(chat_id, text, **kwargs)
+    return await delivery.deliver(chat_id, lambda: bot.send_message(chat_id, text, **kwargs))
 
 
 async def delete_message(chat_id: int, message_id: int) -> bool | None:
-    with suppress(Exception):
-        return await bot.delete_message(chat_id, message_id)
+    return await delivery.deliver(chat_id, lambda: bot.delete_message(chat_id, message_id))
@@ -52,7 +52,7 @@ def create_winning_schemes_keyboard(language: str):
     )
 
 
-def create_leaderboard_keyboard(language: str):
+async def create_leaderboard_keyboard(language: str):
     keyboard_buttons = [
         # [InlineKeyboardButton(text=_("igaming_pass", language), callback_data="igaming_pass")],
         [InlineKeyboardButton(text=_("iguild", language), callback_data="iguild")],
@@ -60,7 +60,7 @@ def create_leaderboard_keyboard(language: str):
         [InlineKeyboardButton(text=_("winning_schemes", language), callback_data="winning_schemes")]
     ]
 
-    if database.get_current_tournament():
+    if await database.get_current_tournament():
         keyboard_buttons.insert(0, [
             InlineKeyboardButton(text=_("leaderboard_weekly", language), callback_data="leaderboard_weekly"),
             InlineKeyboardButton(text=_("leaderboard_all_time_active", language), callback_data="leaderboard_all_time")
@@ -69,7 +69,7 @@ def create_leaderboard_keyboard(language: str):
     return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
 
 
-def create_weekly_leaderboard_keyboard(language: str):
+async def create_weekly_leaderboard_keyboard(language: str):
     keyboard_buttons = [
         # [InlineKeyboardButton(text=_("igaming_pass", language), callback_data="igaming_pass")],
         [InlineKeyboardButton(text=_("iguild", language), callback_data="iguild")],
@@ -77,7 +77,7 @@ def create_weekly_leaderboard_keyboard(language: str):
         [InlineKeyboardButton(text=_("winning_schemes", language), callback_data="winning_schemes")]
     ]
 
-    if database.get_current_tournament():
+    if await database.get_current_tournament():
         keyboard_buttons.insert(0, [
             InlineKeyboardButton(text=_("leaderboard_weekly_active", language), callback_data="leaderboard_weekly"),
             InlineKeyboardButton(text=_("leaderboard_all_time", language), callback_data="leaderboard_all_time")
@@ -0,0 +1,41 @@
+from sortedcontainers import SortedList
+
+
+class Leaderboard:
+    def __init__(self):
+        self.entries = SortedList()
+        self.gems = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self, rows):
+        self.gems = {user_id: gems for user_id, gems in rows if gems > 0}
+        self.entries = SortedList((-gems, user_id) for user_id, gems in self.gems.items())
+
+    def clear(self):
+        self.entries.clear()
+        self.gems.clear()
+
+    def update(self, user_id: int, gems: int):
+        previous_gems = self.gems.pop(user_id, None)
+        if previous_gems is not None:
+            self.entries.remove((-previous_gems, user_id))
+
+        if gems > 0:
+            self.gems[user_id] = gems
+            self.entries.add((-gems, user_id))
+
+    def get_top(self, limit: int = 10) -> list[tuple[int, int]]:
+        return [(user_id, -gems) for gems, user_id in self.entries[:limit]]
+
+    def get_rank(self, user_id: int) -> int | None:
+        gems = self.gems.get(user_id)
+        if gems is None:
+            return None
+
+        return self.entries.index((-gems, user_id)) + 1
+
+
+all_time_leaderboard = Leaderboard()
+tournament_leaderboard = Leaderboard()
@@ -0,0 +1,27 @@
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from src import database
+from src.delivery import delivery
+
+
+class DatabaseSessionMiddleware(BaseMiddleware):
+    async def __call__(self, handler, event: Update, data: dict):
+        async with database.session_scope():
+            return await handler(event, data)
+
+
+class UserMiddleware(BaseMiddleware):
+    async def __call__(self, handler, event: Update, data: dict):
+        user = await database.get_cached_user(data['event_from_user'].id)
+        data['user'] = user
+
+        if user and user.is_undeliverable:
+            delivery.undeliverable_chat_ids.discard(user.chat_id)
+            await database.set_user_deliverable(user)
+
+        result = await handler(event, data)
+        if user:
+            database.cache_user(user)
+
+        return result
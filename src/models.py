@@ -3,14 +3,15 @@ from datetime import datetime
 from aiogram.utils import markdown
 from aiogram.utils.deep_linking import create_deep_link
 from aiogram.utils.link import create_tg_link
-from sqlalchemy import Column, BigInteger, Integer, DateTime, ForeignKey, String, Boolean, Date
+from sqlalchemy import Column, BigInteger, Integer, DateTime, ForeignKey, String, Boolean, Date, Index, Text, text, JSON
+from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, backref
 
 from src.config import DEFAULT_SPINS_AMOUNT, BOT_ADMINS, BOT_USERNAME
 from src.utils import generate_random_name, get_random_time_this_hour
 
-Base = declarative_base()
+Base = declarative_base(cls=AsyncAttrs)
 
 
 class User(Base):
@@ -21,6 +22,7 @@ class User(Base):
     username = Column(String, nullable=False)
     language = Column(String, nullable=False, default='en')
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     anon_name = Column(String, nullable=False, default=generate_random_name)
     email = Column(String, default=None)
     adv_source = Column(String, default=None)
@@ -42,9 +44,11 @@ class User(Base):
     is_active = Column(Boolean, default=False)
     is_muted = Column(Boolean, default=False)
     is_banned = Column(Boolean, default=False)
+    is_undeliverable = Column(Boolean, default=False)
     is_previous_tournament_winner = Column(Boolean, default=False)
 
     last_spin_time = Column(DateTime, default=None)
+    next_warning_time = Column(DateTime, default=None)
     next_refill_time = Column(DateTime, default=None)
     next_autospin_time = Column(DateTime, default=get_random_time_this_hour)
 
@@ -53,6 +57,17 @@ class User(Base):
 
     tournament_stats = relationship('UserTournamentStats', back_populates='user', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        Index('ix_users_chat_id', chat_id, unique=True, postgresql_where=text('NOT is_fake'), sqlite_where=text('is_fake = 0')),
+        Index('ix_users_gems_total', gems_total.desc()),
+        Index('ix_users_referrer_id', referrer_id),
+        Index('ix_users_real_next_refill_time', next_refill_time, postgresql_where=text('NOT is_fake AND NOT is_banned'), sqlite_where=text('is_fake = 0 AND is_banned = 0')),
+        Index('ix_users_real_last_spin_time', last_spin_time, postgresql_where=text('NOT is_fake AND NOT is_banned'), sqlite_where=text('is_fake = 0 AND is_banned = 0')),
+        Index('ix_users_real_next_warning_time', next_warning_time, postgresql_where=text('NOT is_fake AND NOT is_banned'), sqlite_where=text('is_fake = 0 AND is_banned = 0')),
+        Index('ix_users_real_updated_at', updated_at, postgresql_where=text('NOT is_fake'), sqlite_where=text('is_fake = 0')),
+        Index('ix_users_fake_next_autospin_time', next_autospin_time, postgresql_where=text('is_fake AND is_active'), sqlite_where=text('is_fake = 1 AND is_active = 1'))
+    )
+
     @property
     def is_admin(self):
         return self.chat_id in BOT_ADMINS
@@ -102,3 +117,43 @@ class UserTournamentStats(Base):
 
     user = relationship('User', back_populates='tournament_stats')
     tournament = relationship('Tournament', back_populates='user_stats')
+
+    __table_args__ = (
+        Index('ix_user_tournament_stats_tournament_id_gems', tournament_id, gems.desc()),
+    )
+
+
+class OutboxMessage(Base):
+    __tablename__ = 'outbox_messages'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    broadcast = Column(String, nullable=False)
+    chat_id = Column(BigInteger, nullable=False)
+    message_text = Column(Text, nullable=False)
+    reply_markup = Column(Text, default=None)
+    priority = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, default=None)
+    is_delivered = Column(Boolean, default=False)
+
+    __table_args__ = (
+        Index('ix_outbox_messages_pending', priority.desc(), id, postgresql_where=text('sent_at IS NULL'), sqlite_where=text('sent_at IS NULL')),
+        Index('ix_outbox_messages_broadcast', broadcast)
+    )
+
+
+class WinnerSubmission(Base):
+    __tablename__ = 'winner_submissions'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    tournament_id = Column(Integer, ForeignKey('tournaments.id'), nullable=False)
+    row = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    submitted_at = Column(DateTime, default=None)
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=None)
+
+    __table_args__ = (
+        Index('ix_winner_submissions_pending', id, postgresql_where=text('submitted_at IS NULL'), sqlite_where=text('submitted_at IS NULL')),
+    )
@@ -1,135 +1,162 @@
 import asyncio
-import math
+import logging
 import random
 from datetime import timedelta, datetime
+from functools import cache
 
 from src import database
 from src import handlers
-from src.config import DEFAULT_SPINS_AMOUNT, SPIN_REWARDS, ACTIVE_FAKE_USERS_AMOUNT, WIN_EMOJIS, SPIN_REFILL_DELAY, GAME_TOPIC_ID, USERS_SHEET_NAME, REFERRAL_GEMS_RATE, MAIN_GROUP_ID
+from src.broadcasts import broadcaster, create_outbox_message, dump_reply_markup, send_group_message
+from src.config import DEFAULT_SPINS_AMOUNT, SPIN_REWARDS, ACTIVE_FAKE_USERS_AMOUNT, WIN_EMOJIS, SPIN_REFILL_DELAY, GAME_TOPIC_ID, USERS_SHEET_NAME, MAIN_GROUP_ID, REFILL_POLL_INTERVAL, WINNERS_SHEET_NAME, WINNER_SUBMISSIONS_BATCH_SIZE
 from src.keyboards import create_send_email_keyboard, create_play_group_keyboard, create_tournament_keyboard
-from src.sheets import update_google_sheet
-from src.translations import _
-from src.utils import get_spin_result, get_spin_win_text, format_spin_result, get_random_time_this_hour, format_refill_time_info, format_tournament_info
+from src.sheets import update_google_sheet, append_to_google_sheet
+from src.translations import _, create_template, fill_template
+from src.utils import get_spin_result, get_spin_win_text, format_spin_result, get_random_time_this_hour, format_refill_time_info, format_tournament_info, get_warning_level, get_next_warning_time
 
 
-async def update_spins_left():
+@database.with_session
+async def update_spins_left() -> datetime | None:
     now = datetime.utcnow()
 
-    for user in database.get_all_users(is_fake=False, is_banned=False):
-        if not user.next_refill_time or user.next_refill_time >= now:
-            continue
+    due_users = await database.get_users_due_for_refill(now)
+    refilled_users = []
 
+    for user in due_users:
         referral_spins_limit = await handlers.get_bonus_spins_limit(user)
         if user.spins_left < referral_spins_limit:
             user.spins_left = referral_spins_limit
             user.next_refill_time = now + timedelta(hours=SPIN_REFILL_DELAY)
-
-            await asyncio.sleep(0.1)
-            await handlers.send_message(
-                user.chat_id,
-                _("spins_refilled", user.language,
-                  anon_name=user.format_anon_name(),
-                  spins_left=user.spins_left,
-                  refill_time_info=format_refill_time_info(user))
-            )
+            refilled_users.append(user)
         else:
             user.next_refill_time = None
 
-    database.commit()
+    await database.enqueue_outbox_messages([
+        create_outbox_message(
+            "spins_refilled",
+            user.chat_id,
+            _("spins_refilled", user.language,
+              anon_name=user.format_anon_name(),
+              spins_left=user.spins_left,
+              refill_time_info=format_refill_time_info(user)),
+            priority=1
+        )
+        for user in refilled_users
+        if not user.is_undeliverable
+    ])
+    await database.commit()
 
+    for user in due_users:
+        database.invalidate_cached_user(user.chat_id)
 
-async def update_spins_limit():
-    now = datetime.utcnow()
+    return await database.get_next_refill_time()
 
-    for user in database.get_all_users(is_fake=False, is_banned=False):
-        if not user.last_spin_time:
-            continue
 
-        time_since_last_spin = now - user.last_spin_time
-        if time_since_last_spin >= timedelta(hours=24):
-            user.spins_limit = DEFAULT_SPINS_AMOUNT
-        else:
-            user.spins_limit += DEFAULT_SPINS_AMOUNT
+async def run_spin_refills():
+    while True:
+        next_refill_time = None
+
+        try:
+            next_refill_time = await update_spins_left()
+        except Exception:
+            logging.exception("Spin refill failed")
+
+        delay = REFILL_POLL_INTERVAL
+        if next_refill_time:
+            delay = min(delay, max(0, (next_refill_time - datetime.utcnow()).total_seconds()) + 1)
 
-    database.commit()
+        await asyncio.sleep(delay)
 
 
+@database.with_session
+async def update_spins_limit():
+    updated_users = await database.update_spins_limit_for_all_users(DEFAULT_SPINS_AMOUNT)
+    logging.info("Spins limit updated for %s users", updated_users)
+
+
+SPIN_OUTCOMES = [(get_spin_result(dice_value), SPIN_REWARDS.get(get_spin_result(dice_value), 0)) for dice_value in range(1, 65)]
+
+
+@database.with_session
 async def update_fake_autospins():
     now = datetime.utcnow()
 
-    user = next((user for user in database.get_all_users(is_fake=True, is_active=True) if user.next_autospin_time < now), None)
-    if not user:
-        return
+    autospins = []
+    announcements = []
+
+    for user in await database.get_fakes_due_for_autospin(now):
+        outcomes = random.choices(SPIN_OUTCOMES, k=random.randint(5, 10))
+        gems = sum(spin_reward for _spin_result, spin_reward in outcomes)
+        jackpots = sum(spin_result == "777" for spin_result, _spin_reward in outcomes)
 
-    for spin in range(random.randint(5, 10)):
-        spin_result = get_spin_result(random.randint(1, 64))
-        spin_reward = SPIN_REWARDS.get(spin_result, 0)
+        autospins.append((user, len(outcomes), gems, jackpots, get_random_time_this_hour() + timedelta(hours=1)))
 
-        database.record_user_spin(user)
-        database.credit_user_spin_reward(user, spin_reward, spin_result == "777")
+        for spin_result, spin_reward in outcomes:
+            if spin_reward and (len(spin_result) == 3 or (len(spin_result) == 2 and random.random() <= 0.2)):
+                announcements.append((user, spin_result, spin_reward))
 
-        if spin_reward and (len(spin_result) == 3 or (len(spin_result) == 2 and random.random() <= 0.2)):
-            if len(spin_result) == 3:
-                await handlers.send_group_message(GAME_TOPIC_ID, random.choice(WIN_EMOJIS))
+    if not autospins:
+        return
 
-            await handlers.send_group_message(
-                GAME_TOPIC_ID,
-                _("spin_win_group",
-                  random_text=get_spin_win_text(spin_result),
-                  spin_result=format_spin_result(spin_result),
-                  spin_reward=spin_reward,
-                  anon_name=user.format_anon_name())
-            )
+    await database.settle_fake_autospins(autospins)
 
-    user.spins_left = DEFAULT_SPINS_AMOUNT
-    user.next_autospin_time = get_random_time_this_hour() + timedelta(hours=1)
+    for user, spin_result, spin_reward in announcements:
+        if len(spin_result) == 3:
+            await send_group_message(GAME_TOPIC_ID, random.choice(WIN_EMOJIS))
 
-    database.commit()
+        await send_group_message(
+            GAME_TOPIC_ID,
+            _("spin_win_group",
+              random_text=get_spin_win_text(spin_result),
+              spin_result=format_spin_result(spin_result),
+              spin_reward=spin_reward,
+              anon_name=user.format_anon_name())
+        )
 
 
+@database.with_session
 async def send_spin_warnings():
     now = datetime.utcnow()
-    warning_levels = [
-        (1, 12),
-        (2, 24),
-        (3, 72)
-    ]
 
-    current_tournament = database.get_current_tournament()
+    current_tournament = await database.get_current_tournament()
     if not current_tournament:
         return
 
-    for user in database.get_all_users(is_fake=False, is_banned=False):
-        if not user.last_spin_time or user.last_spin_time.date() == now.date():
-            continue
+    warnings = []
+
+    for user in await database.get_users_due_for_warning(now):
+        warning_level = get_warning_level(now - user.last_spin_time)
+        user.next_warning_time = get_next_warning_time(user.last_spin_time, max(warning_level, user.warning_level))
 
-        time_since_last_spin = now - user.last_spin_time
-        current_tournament_stats = database.get_user_tournament_stats(user.id, current_tournament.id)
+        if warning_level > user.warning_level:
+            user.warning_level = warning_level
+            current_tournament_stats = await database.get_user_tournament_stats(user.id, current_tournament.id)
+            warnings.append((user, current_tournament_stats))
 
-        for warning_level, delta_hours in reversed(warning_levels):
-            if time_since_last_spin >= timedelta(hours=delta_hours) and user.warning_level < warning_level:
-                await asyncio.sleep(0.1)
+    await database.commit()
 
-                if user.last_warning_message_id:
-                    await handlers.delete_message(user.chat_id, user.last_warning_message_id)
+    await broadcaster.run(send_spin_warning(user, current_tournament_stats) for user, current_tournament_stats in warnings)
+    await database.commit()
 
-                warning_message = await handlers.send_message(
-                    user.chat_id,
-                    _("no_spins_warning", user.language,
-                      anon_name=user.format_anon_name(),
-                      spins_left=user.spins_left,
-                      tournament_info=format_tournament_info(user, current_tournament_stats))
-                )
 
-                user.warning_level = warning_level
-                user.last_warning_message_id = warning_message.message_id
-                break
+async def send_spin_warning(user, current_tournament_stats):
+    if user.last_warning_message_id:
+        await broadcaster.delete_message(user.chat_id, user.last_warning_message_id)
 
-    database.commit()
+    warning_message = await broadcaster.send_message(
+        user.chat_id,
+        _("no_spins_warning", user.language,
+          anon_name=user.format_anon_name(),
+          spins_left=user.spins_left,
+          tournament_info=format_tournament_info(user, current_tournament_stats))
+    )
+
+    if warning_message:
+        user.last_warning_message_id = warning_message.message_id
 
 
+@database.with_session
 async def start_tournament():
-    fake_users = database.get_all_users(is_fake=True)
+    fake_users = await database.get_all_users(is_fake=True)
     previous_winners = [user for user in fake_users if user.is_previous_tournament_winner]
 
     remaining_users = max(0, ACTIVE_FAKE_USERS_AMOUNT - len(previous_winners))
@@ -141,20 +168,27 @@ async def start_tournament():
         user.is_active = user.is_previous_tournament_winner or user in active_users
         user.next_autospin_time = get_random_time_this_hour()
 
-    database.commit()
-    database.reset_spins_for_all_users(DEFAULT_SPINS_AMOUNT)
+    await database.commit()
+    await database.reset_spins_for_all_users(DEFAULT_SPINS_AMOUNT)
 
-    new_tournament = database.start_new_tournament()
+    new_tournament = await database.start_new_tournament()
     tournament_start_date = new_tournament.start_date.strftime('%Y/%m/%d')
 
-    for user in database.get_all_users(is_fake=False, is_banned=False):
-        await asyncio.sleep(0.1)
-        await handlers.send_message(
-            user.chat_id,
-            _("tournament_started", user.language, anon_name=user.format_anon_name(), tournament_start_date=tournament_start_date),
-            reply_markup=create_tournament_keyboard(user.language)
+    @cache
+    def render(language):
+        return (
+            create_template("tournament_started", language, slots=('anon_name',), tournament_start_date=tournament_start_date),
+            dump_reply_markup(create_tournament_keyboard(language))
         )
 
+    messages = []
+    for user in await database.get_all_users(is_fake=False, is_banned=False, is_undeliverable=False):
+        template, reply_markup = render(user.language)
+        messages.append(create_outbox_message("tournament_started", user.chat_id, fill_template(template, anon_name=user.format_anon_name()), reply_markup=reply_markup))
+
+    await database.enqueue_outbox_messages(messages)
+    await database.commit()
+
     await handlers.send_group_message(GAME_TOPIC_ID, "📣")
     group_message = await handlers.send_group_message(
         GAME_TOPIC_ID,
@@ -168,62 +202,44 @@ async def start_tournament():
     await result_message.pin()
 
 
-async def end_tournament():
-    current_tournament = database.end_current_tournament()
-    if not current_tournament:
-        return
-
-    leaderboard = database.get_tournament_leaderboard(current_tournament.id)[:3]
-    if not leaderboard:
-        return
-
+async def create_tournament_ended_messages(tournament, leaderboard) -> list[dict]:
     user_place_keys = ['first_place', 'second_place', 'third_place']
-    group_place_keys = ['first_place_group', 'second_place_group', 'third_place_group']
 
     leaderboard_entries = [
         _(user_place_keys[place], stats.user.language, anon_name=stats.user.mention_anon_name(), gems=stats.gems)
         for place, stats in enumerate(leaderboard)
     ]
 
-    tournament_end_date = current_tournament.end_date
+    tournament_end_date = tournament.end_date
     tournament_start_date = datetime.utcnow() + timedelta(days=(7 - datetime.utcnow().weekday()) % 7)
 
-    for user in database.get_all_users(is_banned=False):
-        user_place, user_stats = next(((place, stats) for place, stats in enumerate(leaderboard, 1) if stats.user == user), (None, None))
-        message_key = 'tournament_ended_winner' if user_place else 'tournament_ended_loser'
-
-        if user_place:
-            user.tournament_wins += 1
-            if user_place == 1:
-                if user.is_previous_tournament_winner:
-                    user.tournament_king_wins += 1
-                    user.max_tournament_king_wins = max(user.max_tournament_king_wins, user.tournament_king_wins)
-                user.is_previous_tournament_winner = True
-            else:
-                user.tournament_king_wins = 0
-                user.is_previous_tournament_winner = False
-
-            if user.referrer:
-                user.referrer.gems_total += math.ceil(user_stats.gems * REFERRAL_GEMS_RATE)
-        else:
-            user.tournament_king_wins = 0
-            user.is_previous_tournament_winner = False
-
-        database.commit()
+    winner_ids = {stats.user_id for stats in leaderboard}
 
-        if user.is_fake:
-            continue
-
-        await asyncio.sleep(0.1)
-        await handlers.send_message(
-            user.chat_id,
-            _(message_key, user.language,
+    @cache
+    def render(language, is_winner):
+        return (
+            _('tournament_ended_winner' if is_winner else 'tournament_ended_loser', language,
               tournament_end_date=tournament_end_date.strftime('%Y/%m/%d'),
               tournament_start_date=tournament_start_date.strftime('%Y/%m/%d'),
               leaderboard_text="\n".join(leaderboard_entries)),
-            reply_markup=create_send_email_keyboard(user.language, current_tournament.id) if user_place else create_tournament_keyboard(user.language)
+            dump_reply_markup(create_send_email_keyboard(language, tournament.id) if is_winner else create_tournament_keyboard(language))
         )
 
+    return [
+        create_outbox_message("tournament_ended", user.chat_id, *render(user.language, user.id in winner_ids))
+        for user in await database.get_all_users(is_fake=False, is_banned=False, is_undeliverable=False)
+    ]
+
+
+@database.with_session
+async def end_tournament():
+    current_tournament, leaderboard = await database.end_current_tournament(create_tournament_ended_messages)
+    if not current_tournament or not leaderboard:
+        return
+
+    group_place_keys = ['first_place_group', 'second_place_group', 'third_place_group']
+    tournament_end_date = current_tournament.end_date
+
     group_leaderboard_entries = [
         _(group_place_keys[place], anon_name=stats.user.mention_anon_name(), gems=stats.gems)
         for place, stats in enumerate(leaderboard)
@@ -244,9 +260,17 @@ async def end_tournament():
     await result_message.pin()
 
 
+last_google_sheets_unload_time = None
+
+
+@database.with_session
 async def unload_to_google_sheets():
-    users = database.get_all_users(is_fake=False)
+    global last_google_sheets_unload_time
+
+    unload_time = datetime.utcnow() - timedelta(minutes=1)
+    users = await database.get_users_updated_since(last_google_sheets_unload_time)
     if not users:
+        last_google_sheets_unload_time = unload_time
         return
 
     rows = []
@@ -271,4 +295,37 @@ async def unload_to_google_sheets():
             'Next Refill Time': user.next_refill_time.strftime('%Y-%m-%d %H:%M:%S') if user.next_refill_time else '-'
         })
 
-    update_google_sheet(USERS_SHEET_NAME, 'ID', rows)
+    if await update_google_sheet(USERS_SHEET_NAME, 'ID', rows):
+        last_google_sheets_unload_time = unload_time
+
+
+winner_submissions_lock = asyncio.Lock()
+
+
+@database.with_session
+async def flush_winner_submissions():
+    if winner_submissions_lock.locked():
+        return
+
+    async with winner_submissions_lock:
+        submissions = await database.get_pending_winner_submissions(WINNER_SUBMISSIONS_BATCH_SIZE, datetime.utcnow())
+        if submissions:
+            await submit_winner_submissions(submissions)
+
+
+async def submit_winner_submissions(submissions: list) -> bool:
+    if await append_to_google_sheet(WINNERS_SHEET_NAME, [submission.row for submission in submissions]):
+        await database.mark_winner_submissions(submissions, True)
+        return True
+
+    if len(submissions) == 1:
+        await database.mark_winner_submissions(submissions, False)
+        logging.warning("Winner submission %s failed %s times", submissions[0].id, submissions[0].attempts)
+        return False
+
+    middle = len(submissions) // 2
+    if await submit_winner_submissions(submissions[:middle]):
+        return await submit_winner_submissions(submissions[middle:]) or True
+
+    await database.postpone_winner_submissions(submissions[middle:])
+    return False
@@ -1,40 +1,187 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
 
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 
+from src.config import SHEETS_BATCH_SIZE, SHEETS_QUEUE_SIZE
+
 scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
 creds = ServiceAccountCredentials.from_json_keyfile_name("assets/google_credentials.json", scope)
 client = gspread.authorize(creds)
 
 
-def add_to_google_sheet(sheet_name: str, data: dict) -> bool:
-    worksheet = client.open(sheet_name).sheet1
-    headers, values = list(data.keys()), list(data.values())
+worksheets = {}
+sheet_headers = {}
+row_indexes = {}
+
+
+def get_worksheet(sheet_name: str) -> gspread.Worksheet:
+    if sheet_name not in worksheets:
+        worksheets[sheet_name] = client.open(sheet_name).sheet1
+
+    return worksheets[sheet_name]
+
+
+def update_headers(sheet_name: str, worksheet: gspread.Worksheet, headers: list) -> bool:
+    if sheet_name not in sheet_headers:
+        sheet_headers[sheet_name] = worksheet.row_values(1)
+
+    if sheet_headers[sheet_name] == headers:
+        return False
+
+    worksheet.update([headers], '1:1')
+    sheet_headers[sheet_name] = headers
+    return True
+
+
+def get_row_index(sheet_name: str, worksheet: gspread.Worksheet, id_column_number: int) -> dict:
+    if sheet_name not in row_indexes:
+        row_indexes[sheet_name] = read_row_index(worksheet, id_column_number)
+
+    return row_indexes[sheet_name]
+
+
+def read_row_index(worksheet: gspread.Worksheet, id_column_number: int) -> dict:
+    return {row_id: index for index, row_id in enumerate(worksheet.col_values(id_column_number)[1:], 2) if row_id}
+
+
+def get_first_appended_row(response: dict) -> int:
+    updated_range = response['updates']['updatedRange'].split('!')[-1]
+    return gspread.utils.a1_to_rowcol(updated_range.split(':')[0])[0]
+
+
+def forget_sheet(sheet_name: str):
+    worksheets.pop(sheet_name, None)
+    sheet_headers.pop(sheet_name, None)
+    row_indexes.pop(sheet_name, None)
+
+
+def append_sheet_rows(sheet_name: str, rows: list) -> bool:
+    headers = list(rows[0].keys())
 
     with suppress(Exception):
-        worksheet.update([headers], '1:1')
-        worksheet.append_row(values)
+        worksheet = get_worksheet(sheet_name)
+        update_headers(sheet_name, worksheet, headers)
+
+        for chunk in chunked([list(row.values()) for row in rows], SHEETS_BATCH_SIZE):
+            worksheet.append_rows(chunk)
+
+        row_indexes.pop(sheet_name, None)
         return True
-    return False
 
+    forget_sheet(sheet_name)
+    return False
 
-def update_google_sheet(sheet_name: str, id_column: str, rows: list) -> bool:
-    worksheet = client.open(sheet_name).sheet1
-    records = worksheet.get_all_records()
 
+def update_sheet_rows(sheet_name: str, id_column: str, rows: list) -> bool:
     headers = list(rows[0].keys())
-    existing_data = {row[id_column]: index for index, row in enumerate(records, 2)}
 
     with suppress(Exception):
-        worksheet.update([headers], '1:1')
+        worksheet = get_worksheet(sheet_name)
+        if update_headers(sheet_name, worksheet, headers):
+            row_indexes.pop(sheet_name, None)
+
+        id_column_number = headers.index(id_column) + 1
+        is_cached = sheet_name in row_indexes
+        row_index = get_row_index(sheet_name, worksheet, id_column_number)
+
+        if is_cached and any(str(row.get(id_column)) in row_index for row in rows):
+            row_index = row_indexes[sheet_name] = read_row_index(worksheet, id_column_number)
 
+        updated_rows, new_rows = [], []
         for row in rows:
-            row_id, values = row.get(id_column), list(row.values())
-            if row_id in existing_data:
-                worksheet.update([values], f'A{existing_data[row_id]}')
+            row_id, values = str(row.get(id_column)), list(row.values())
+            if row_id in row_index:
+                updated_rows.append({'range': f'A{row_index[row_id]}', 'values': [values]})
             else:
-                worksheet.append_row(values)
+                new_rows.append(values)
+
+        for chunk in chunked(updated_rows, SHEETS_BATCH_SIZE):
+            worksheet.batch_update(chunk)
+
+        for chunk in chunked(new_rows, SHEETS_BATCH_SIZE):
+            first_row = get_first_appended_row(worksheet.append_rows(chunk))
+            if first_row != len(row_index) + 2:
+                row_indexes.pop(sheet_name, None)
+                continue
+
+            row_index.update({str(values[headers.index(id_column)]): row for row, values in enumerate(chunk, first_row)})
 
         return True
+
+    forget_sheet(sheet_name)
     return False
+
+
+def chunked(items: list, size: int):
+    for index in range(0, len(items), size):
+        yield items[index:index + size]
+
+
+def update_pending_sheet_rows(sheet_name: str, id_column: str, pending_rows: dict) -> bool:
+    return update_sheet_rows(sheet_name, id_column, list(pending_rows.values()))
+
+
+class SheetsWorker:
+    def __init__(self, queue_size: int):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sheets')
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.pending_updates = {}
+        self.task = None
+
+    def submit(self, pending_key: str | None, func, *args) -> asyncio.Future | None:
+        if not self.task:
+            self.task = asyncio.create_task(self.work())
+
+        result = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((pending_key, func, args, result))
+        except asyncio.QueueFull:
+            logging.warning("Sheets queue is full, rejecting %s", func.__name__)
+            return None
+
+        return result
+
+    async def work(self):
+        while True:
+            pending_key, func, args, result = await self.queue.get()
+            if pending_key:
+                self.pending_updates.pop(pending_key, None)
+
+            try:
+                result.set_result(await asyncio.get_running_loop().run_in_executor(self.executor, func, *args))
+            except Exception as error:
+                result.set_exception(error)
+
+    async def run(self, func, *args):
+        result = self.submit(None, func, *args)
+        return await asyncio.shield(result) if result else False
+
+    async def update(self, sheet_name: str, id_column: str, rows: list) -> bool:
+        pending_update = self.pending_updates.get(sheet_name)
+        if pending_update:
+            pending_rows, result = pending_update
+            pending_rows.update({row[id_column]: row for row in rows})
+            return await asyncio.shield(result)
+
+        pending_rows = {row[id_column]: row for row in rows}
+        result = self.submit(sheet_name, update_pending_sheet_rows, sheet_name, id_column, pending_rows)
+        if not result:
+            return False
+
+        self.pending_updates[sheet_name] = (pending_rows, result)
+        return await asyncio.shield(result)
+
+
+sheets_worker = SheetsWorker(SHEETS_QUEUE_SIZE)
+
+
+async def append_to_google_sheet(sheet_name: str, rows: list) -> bool:
+    return await sheets_worker.run(append_sheet_rows, sheet_name, rows)
+
+
+async def update_google_sheet(sheet_name: str, id_column: str, rows: list) -> bool:
+    return await sheets_worker.update(sheet_name, id_column, rows)
@@ -35,6 +35,21 @@ def translate(key: str, language: str = DEFAULT_LANGUAGE, **kwargs) -> str:
     return template.format(**kwargs).strip()
 
 
+def create_template(key: str, language: str = DEFAULT_LANGUAGE, slots: tuple = (), **kwargs) -> str:
+    return translate(key, language, **{slot: get_template_slot(slot) for slot in slots}, **kwargs)
+
+
+def fill_template(template: str, **kwargs) -> str:
+    for key, value in kwargs.items():
+        template = template.replace(get_template_slot(key), str(value))
+
+    return template
+
+
+def get_template_slot(key: str) -> str:
+    return f'\x00{key}\x00'
+
+
 def get_all_translations(key: str) -> list[str]:
     return [language.get(key) for language in translations.values()]
 
@@ -1,10 +1,10 @@
 import random
 import re
-from datetime import datetime
+from datetime import datetime, timedelta, time
 
 from faker import Faker
 
-from src.config import DEFAULT_LANGUAGE
+from src.config import DEFAULT_LANGUAGE, SPIN_WARNING_LEVELS, WINNER_SUBMISSIONS_RETRY_DELAY, WINNER_SUBMISSIONS_MAX_RETRY_DELAY
 from src.translations import _
 
 fake = Faker()
@@ -25,6 +25,23 @@ def format_spin_result(spin_result: str) -> str:
     return spin_result.replace('7', '7️⃣').replace('g', '🍇').replace('b', '🍸').replace('l', '🍋')
 
 
+def get_warning_level(time_since_last_spin: timedelta) -> int:
+    return next((level for level, delta_hours in reversed(SPIN_WARNING_LEVELS) if time_since_last_spin >= timedelta(hours=delta_hours)), 0)
+
+
+def get_next_warning_time(last_spin_time: datetime, warning_level: int) -> datetime | None:
+    delta_hours = next((delta_hours for level, delta_hours in SPIN_WARNING_LEVELS if level > warning_level), None)
+    if delta_hours is None:
+        return None
+
+    next_day = datetime.combine(last_spin_time.date() + timedelta(days=1), time.min)
+    return max(last_spin_time + timedelta(hours=delta_hours), next_day)
+
+
+def get_next_submission_attempt_time(attempts: int, now: datetime) -> datetime:
+    return now + timedelta(seconds=min(WINNER_SUBMISSIONS_RETRY_DELAY * 2 ** (attempts - 1), WINNER_SUBMISSIONS_MAX_RETRY_DELAY))
+
+
 def format_next_refill_time(user) -> str:
     remaining_time = user.next_refill_time - datetime.utcnow()
     total_seconds = int(remaining_time.total_seconds())
@@ -64,6 +81,10 @@ def format_refill_time_info(user) -> str:
     )
 
 
+def format_leaderboard_position(rank: int | None, total: int, language: str) -> str:
+    return _("leaderboard_position", language, rank=rank, total=total) if rank else "***"
+
+
 def format_admin_user_info(user, target) -> str:
     return (
         _("admin_user_info", user.language,
@@ -1,5 +1,5 @@
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import FileResponse
 
 from src import database
@@ -12,6 +12,12 @@ from src.translations import _
 app = FastAPI()
 
 
+@app.middleware("http")
+async def database_session_middleware(request: Request, call_next):
+    async with database.session_scope():
+        return await call_next(request)
+
+
 @app.get("/")
 async def index_route():
     return FileResponse("assets/templates/index.html")
@@ -24,7 +30,7 @@ async def share_route():
 
 @app.get("/results")
 async def result_route(user_id: int):
-    user = database.get_user(user_id)
+    user = await database.get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -33,12 +39,13 @@ async def result_route(user_id: int):
 
 @app.post("/watch_ad", status_code=204)
 async def watch_ad_route(user_id: int):
-    user = database.get_user(user_id)
+    user = await database.get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     user.spins_left += 10
-    database.commit()
+    await database.commit()
+    database.invalidate_cached_user(user.chat_id)
 
     await bot.send_message(
         user.chat_id,
@@ -0,0 +1,37 @@
+import asyncio
+import inspect
+from unittest import mock
+
+import gspread
+import pytest
+from oauth2client.service_account import ServiceAccountCredentials
+
+from benchmarks.common import setup_environment
+from tests.fake_sheets import FakeClient
+
+setup_environment('tests.db')
+
+with mock.patch.object(ServiceAccountCredentials, 'from_json_keyfile_name'), mock.patch.object(gspread, 'authorize'):
+    from src import sheets
+    from src.config import SHEETS_QUEUE_SIZE
+
+
+@pytest.fixture
+def fake_client(monkeypatch) -> FakeClient:
+    client = FakeClient()
+    monkeypatch.setattr(sheets, 'client', client)
+    monkeypatch.setattr(sheets, 'worksheets', {})
+    monkeypatch.setattr(sheets, 'sheet_headers', {})
+    monkeypatch.setattr(sheets, 'row_indexes', {})
+    monkeypatch.setattr(sheets, 'sheets_worker', sheets.SheetsWorker(SHEETS_QUEUE_SIZE))
+    return client
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+
+    arguments = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    asyncio.run(pyfuncitem.obj(**arguments))
+    return True
@@ -0,0 +1,68 @@
+import time
+from collections import Counter
+
+from gspread.utils import a1_to_rowcol, rowcol_to_a1
+
+
+class FakeWorksheet:
+    def __init__(self, title: str, latency: float = 0):
+        self.title = title
+        self.latency = latency
+        self.rows = []
+        self.calls = Counter()
+
+    def call(self, name: str):
+        self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def row_values(self, row: int) -> list:
+        self.call('row_values')
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def col_values(self, col: int) -> list:
+        self.call('col_values')
+        return [row[col - 1] if col <= len(row) else '' for row in self.rows]
+
+    def update(self, values: list, range_name: str):
+        self.call('update')
+        self.set_rows(int(range_name.split(':')[0]), values)
+
+    def batch_update(self, data: list):
+        self.call('batch_update')
+        for item in data:
+            self.set_rows(a1_to_rowcol(item['range'])[0], item['values'])
+
+    def append_rows(self, values: list) -> dict:
+        self.call('append_rows')
+        first_row = len(self.rows) + 1
+        self.set_rows(first_row, values)
+        last_cell = rowcol_to_a1(len(self.rows), max(len(row) for row in values))
+        return {'updates': {'updatedRange': f"'{self.title}'!A{first_row}:{last_cell}"}}
+
+    def set_rows(self, first_row: int, values: list):
+        while len(self.rows) < first_row + len(values) - 1:
+            self.rows.append([])
+
+        for index, row in enumerate(values, first_row - 1):
+            self.rows[index] = [str(value) for value in row]
+
+
+class FakeSpreadsheet:
+    def __init__(self, title: str, latency: float = 0):
+        self.sheet1 = FakeWorksheet(title, latency)
+
+
+class FakeClient:
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+        self.spreadsheets = {}
+
+    def open(self, title: str) -> FakeSpreadsheet:
+        if title not in self.spreadsheets:
+            self.spreadsheets[title] = FakeSpreadsheet(title, self.latency)
+
+        return self.spreadsheets[title]
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        return self.open(title).sheet1
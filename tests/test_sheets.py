@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+from src import sheets
+from src.config import SHEETS_BATCH_SIZE
+
+
+def create_rows(amount: int, gems: int = 0) -> list[dict]:
+    return [{'ID': 1000 + index, 'Username': f'user{index}', 'Total Gems': gems} for index in range(amount)]
+
+
+async def test_first_export_appends_rows_in_batches(fake_client):
+    rows = create_rows(SHEETS_BATCH_SIZE * 2 + 1)
+
+    assert await sheets.update_google_sheet('users', 'ID', rows)
+
+    worksheet = fake_client.worksheet('users')
+    assert worksheet.calls['append_rows'] == 3
+    assert worksheet.calls['batch_update'] == 0
+    assert worksheet.rows[0] == ['ID', 'Username', 'Total Gems']
+    assert len(worksheet.rows) == len(rows) + 1
+
+
+async def test_repeated_export_updates_rows_in_batches(fake_client):
+    await sheets.update_google_sheet('users', 'ID', create_rows(SHEETS_BATCH_SIZE * 2))
+    worksheet = fake_client.worksheet('users')
+    worksheet.calls.clear()
+
+    assert await sheets.update_google_sheet('users', 'ID', create_rows(SHEETS_BATCH_SIZE * 2, gems=5))
+
+    assert worksheet.calls['batch_update'] == 2
+    assert worksheet.calls['append_rows'] == 0
+    assert worksheet.calls['col_values'] == 1
+    assert worksheet.calls['row_values'] == 0
+    assert all(row[2] == '5' for row in worksheet.rows[1:])
+
+
+async def test_mixed_export_updates_and_appends_once(fake_client):
+    await sheets.update_google_sheet('users', 'ID', create_rows(10))
+    worksheet = fake_client.worksheet('users')
+    worksheet.calls.clear()
+
+    assert await sheets.update_google_sheet('users', 'ID', create_rows(20, gems=1))
+
+    assert worksheet.calls['batch_update'] == 1
+    assert worksheet.calls['append_rows'] == 1
+    assert len(worksheet.rows) == 21
+
+    worksheet.calls.clear()
+    await sheets.update_google_sheet('users', 'ID', create_rows(20, gems=2))
+
+    assert worksheet.calls['batch_update'] == 1
+    assert worksheet.calls['append_rows'] == 0
+
+
+async def test_stale_row_index_is_rebuilt(fake_client):
+    await sheets.update_google_sheet('users', 'ID', create_rows(2))
+    worksheet = fake_client.worksheet('users')
+    worksheet.append_rows([['999', 'manual', '0']])
+
+    await sheets.update_google_sheet('users', 'ID', create_rows(3)[2:])
+    assert 'users' not in sheets.row_indexes
+
+    worksheet.calls.clear()
+    await sheets.update_google_sheet('users', 'ID', create_rows(3, gems=7))
+
+    assert worksheet.calls['col_values'] == 1
+    assert worksheet.calls['append_rows'] == 0
+    assert len(worksheet.rows) == 5
+    assert worksheet.rows[4] == ['1002', 'user2', '7']
+
+
+async def test_sorted_sheet_updates_matching_rows(fake_client):
+    await sheets.update_google_sheet('users', 'ID', [{'ID': row_id, 'Total Gems': row_id} for row_id in (1, 2, 3)])
+    worksheet = fake_client.worksheet('users')
+    worksheet.rows[1:] = sorted(worksheet.rows[1:], key=lambda row: -int(row[1]))
+
+    await sheets.update_google_sheet('users', 'ID', [{'ID': 1, 'Total Gems': 10}])
+
+    assert worksheet.rows == [['ID', 'Total Gems'], ['3', '3'], ['2', '2'], ['1', '10']]
+    assert worksheet.calls['append_rows'] == 1
+
+
+async def test_append_sends_one_request_per_batch(fake_client):
+    rows = create_rows(SHEETS_BATCH_SIZE + 1)
+
+    assert await sheets.append_to_google_sheet('winners', rows)
+
+    worksheet = fake_client.worksheet('winners')
+    assert worksheet.calls['append_rows'] == 2
+    assert len(worksheet.rows) == len(rows) + 1
+
+
+async def test_slow_export_does_not_block_event_loop(fake_client):
+    fake_client.latency = 0.05
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.create_task(tick())
+    started_at = time.monotonic()
+    assert await sheets.update_google_sheet('users', 'ID', create_rows(SHEETS_BATCH_SIZE * 2))
+    elapsed = time.monotonic() - started_at
+    ticker.cancel()
+
+    worksheet = fake_client.worksheet('users')
+    assert elapsed >= sum(worksheet.calls.values()) * fake_client.latency
+    assert ticks >= 5